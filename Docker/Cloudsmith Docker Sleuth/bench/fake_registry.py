@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Cloudsmith Docker registry and packages API.
+
+Serves just enough of both for multiarch.py to run against it:
+
+    GET  /v2/<ws>/<repo>/_catalog?n=N&last=NAME                    (Link pagination)
+    GET  /v2/<ws>/<repo>/<img>/tags/list
+    GET  /v2/<ws>/<repo>/<img>/manifests/<tag|digest>
+    GET  /v1/packages/<ws>/<repo>/?query=...&page=N&page_size=N   (Link pagination)
+    DELETE /v1/packages/<ws>/<repo>/<slug>/                         (removes it from the listings)
+
+plus /_stats and /_reset for the benchmark runner. Latency, X-RateLimit-*
+headers and random 429s are configurable so throttling paths can be measured.
+
+Run standalone:  python3 fake_registry.py --images 2 --tags 3 --port 8765
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+PLATFORMS = [("linux", arch) for arch in ["amd64", "arm64", "arm", "ppc64le", "s390x", "386", "riscv64", "mips64le"]]
+INDEX_MEDIA_TYPE = "application/vnd.oci.image.index.v1+json"
+IMAGE_MEDIA_TYPE = "application/vnd.oci.image.manifest.v1+json"
+
+def sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+# --- Dataset ---
+
+class Dataset:
+    """Synthetic repository: N images, each with tagged and untagged manifest lists.
+
+    `single` adds that many tags per image (solo0, solo1, ...) pointing at a
+    single-platform image manifest instead of a manifest list.
+    """
+
+    def __init__(self, images=2, tags=3, platforms=3, untagged=2, single=0):
+        self.catalog = []
+        self.packages = []
+        self.by_name = {}
+        self.by_slug = {}
+        self.manifests = {}
+        self.tags = {}
+        self.lock = threading.Lock()
+
+        for i in range(images):
+            img = f"img{i}"
+            self.catalog.append(img)
+            lists = [(f"{img}-tagged-{t}", [f"v{t}"]) for t in range(tags)]
+            if tags:
+                lists[-1][1].append("latest")
+            lists += [(f"{img}-untagged-{u}", []) for u in range(untagged)]
+            self.tags[img] = [t for _, names in lists for t in names]
+
+            for key, names in lists:
+                self._add_manifest_list(img, key, names, platforms)
+            for s in range(single):
+                self._add_single(img, f"solo{s}")
+
+    def _add_single(self, img, name):
+        child = sha256(f"{img}-{name}")
+        digest = self._store(img, f"sha256:{child}", {"schemaVersion": 2, "mediaType": IMAGE_MEDIA_TYPE,
+                                                      "config": {"digest": f"sha256:{sha256(child + '-config')}"},
+                                                      "layers": [{"digest": f"sha256:{sha256(child + '-layer')}"}]})
+        self.manifests[(img, name)] = self.manifests[(img, digest)]
+        self.tags[img].append(name)
+        self._add_package(img, child, "image", {"version": [name]})
+
+    def _add_manifest_list(self, img, key, names, platforms):
+        children = []
+        for p in range(platforms):
+            os_name, arch = PLATFORMS[p % len(PLATFORMS)]
+            child = sha256(f"{key}-child-{p}")
+            children.append({"digest": f"sha256:{child}", "mediaType": IMAGE_MEDIA_TYPE,
+                             "platform": {"os": os_name, "architecture": arch}})
+            self._store(img, f"sha256:{child}", {"schemaVersion": 2, "mediaType": IMAGE_MEDIA_TYPE,
+                                                 "config": {"digest": f"sha256:{sha256(child + '-config')}"},
+                                                 "layers": []})
+            self._add_package(img, child, "image", {})
+
+        # Build attestations show up as unknown/unknown children
+        children.append({"digest": f"sha256:{sha256(key + '-attestation')}",
+                         "platform": {"os": "unknown", "architecture": "unknown"}})
+        index = {"schemaVersion": 2, "mediaType": INDEX_MEDIA_TYPE, "manifests": children}
+        digest = self._store(img, None, index)
+        for name in names:
+            self.manifests[(img, name)] = self.manifests[(img, digest)]
+        self._add_package(img, digest.split(":", 1)[1], "manifest/list", {"version": names} if names else {})
+
+    def _store(self, img, digest, manifest):
+        body = json.dumps(manifest).encode()
+        digest = digest or f"sha256:{hashlib.sha256(body).hexdigest()}"
+        self.manifests[(img, digest)] = (digest, body)
+        return digest
+
+    def _add_package(self, img, version, type_display, tags):
+        pkg = {"name": img, "version": version, "format": "docker", "type_display": type_display,
+               "status_str": "Completed", "downloads": int(version[:4], 16) % 100,
+               "slug": f"slug-{version[:16]}", "tags": tags}
+        self.packages.append(pkg)
+        self.by_name.setdefault(img, []).append(pkg)
+        self.by_slug[pkg["slug"]] = pkg
+
+    def delete(self, slug):
+        """Removes the package with this slug from the listings; False if there is none."""
+        with self.lock:
+            pkg = self.by_slug.pop(slug, None)
+            if pkg is None:
+                return False
+            self.packages.remove(pkg)
+            self.by_name[pkg["name"]].remove(pkg)
+            return True
+
+    def query(self, q):
+        """Evaluates the small subset of the package search syntax multiarch.py sends."""
+        terms = dict(part.strip().split(":", 1) for part in q.split(" AND ") if ":" in part)
+        with self.lock:
+            pool = list(self.by_name.get(terms["name"], []) if "name" in terms else self.packages)
+        results = []
+        for pkg in pool:
+            if "format" in terms and pkg["format"] != terms["format"]:
+                continue
+            version = terms.get("version")
+            if version and pkg["version"] != version and version not in pkg["tags"].get("version", []):
+                continue
+            results.append(pkg)
+        return results
+
+# --- Server ---
+
+class Behaviour:
+    """Knobs applied to every response, shared by all handler threads."""
+
+    def __init__(self, latency=0.0, rate_limit=None, rate_window=1.0, error_rate=0.0, retry_after=None, page_size=30,
+                 catalog_page_size=None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.catalog_page_size = catalog_page_size
+        self.lock = threading.Lock()
+        self.window_reset = 0.0
+        self.window_used = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {"requests": 0, "throttled": 0, "injected": 0, "by_endpoint": {}}
+
+    def admit(self, endpoint):
+        """Counts the request and returns (throttled, rate-limit headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_endpoint"][endpoint] = self.stats["by_endpoint"].get(endpoint, 0) + 1
+
+            headers = {}
+            throttled = False
+            if self.rate_limit:
+                now = time.time()
+                if now >= self.window_reset:
+                    self.window_reset = now + self.rate_window
+                    self.window_used = 0
+                self.window_used += 1
+                remaining = self.rate_limit - self.window_used
+                headers = {"X-RateLimit-Limit": str(self.rate_limit),
+                           "X-RateLimit-Remaining": str(max(remaining, 0)),
+                           "X-RateLimit-Reset": f"{self.window_reset:.3f}"}
+                if remaining < 0:
+                    throttled = True
+                    self.stats["throttled"] += 1
+            if not throttled and self.error_rate and random.random() < self.error_rate:
+                throttled = True
+                self.stats["injected"] += 1
+            if throttled and self.retry_after is not None:
+                headers["Retry-After"] = str(self.retry_after)
+            return throttled, headers
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    dataset = None
+    behaviour = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status, obj, headers=None):
+        self._send(status, json.dumps(obj).encode(), headers)
+
+    def _handle(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+
+        if url.path == "/_stats":
+            return self._json(200, self.behaviour.stats)
+        if url.path == "/_reset":
+            self.behaviour.reset_stats()
+            return self._send(204)
+
+        endpoint = self._endpoint(parts)
+        throttled, headers = self.behaviour.admit(endpoint)
+        if throttled:
+            return self._json(429, {"detail": "Request was throttled."}, headers)
+
+        if endpoint == "catalog":
+            return self._catalog(url, headers)
+        if endpoint == "tags":
+            img = "/".join(parts[3:-2])
+            return self._json(200, {"name": img, "tags": self.dataset.tags.get(img, [])}, headers)
+        if endpoint == "manifest":
+            mi = parts.index("manifests")
+            entry = self.dataset.manifests.get(("/".join(parts[3:mi]), parts[mi + 1]))
+            if entry is None:
+                return self._json(404, {"errors": [{"code": "MANIFEST_UNKNOWN"}]}, headers)
+            digest, body = entry
+            headers.update({"Docker-Content-Digest": digest, "ETag": f'"{digest}"'})
+            return self._conditional(body, headers)
+        if endpoint == "packages":
+            return self._packages(url, headers)
+        if endpoint == "delete":
+            if not self.dataset.delete(parts[-1]):
+                return self._json(404, {"detail": "Not found."}, headers)
+            return self._send(204, b"", headers)
+        return self._json(404, {"detail": "Not found."}, headers)
+
+    def _endpoint(self, parts):
+        if parts[0] == "v2":
+            if parts[-1] == "_catalog":
+                return "catalog"
+            if parts[-2:] == ["tags", "list"]:
+                return "tags"
+            if "manifests" in parts:
+                return "manifest"
+        if parts[:2] == ["v1", "packages"]:
+            return "delete" if self.command == "DELETE" else "packages"
+        return "other"
+
+    def _conditional(self, body, headers):
+        etag = headers.get("ETag") or f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        headers["ETag"] = etag
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", headers)
+        return self._send(200, body, headers)
+
+    def _catalog(self, url, headers):
+        qs = parse_qs(url.query)
+        names = sorted(self.dataset.catalog)
+        if "last" in qs:
+            names = [n for n in names if n > qs["last"][0]]
+        # Like real registries, the server may return fewer than the n asked for
+        limit = min(int(qs.get("n", [str(len(names))])[0]), self.behaviour.catalog_page_size or len(names))
+        if limit < len(names):
+            query = urlencode({"n": qs.get("n", [limit])[0], "last": names[limit - 1]})
+            headers["Link"] = f'<{url.path}?{query}>; rel="next"'
+        return self._conditional(json.dumps({"repositories": names[:limit]}).encode(), headers)
+
+    def _packages(self, url, headers):
+        qs = parse_qs(url.query)
+        page = int(qs.get("page", ["1"])[0])
+        page_size = int(qs.get("page_size", [str(self.behaviour.page_size)])[0])
+        results = self.dataset.query(qs.get("query", [""])[0])
+        headers["X-Pagination-Count"] = str(len(results))
+        if page * page_size < len(results):
+            params = {k: v[0] for k, v in qs.items()}
+            params["page"] = page + 1
+            headers["Link"] = f'<http://{self.headers["Host"]}{url.path}?{urlencode(params)}>; rel="next"'
+        return self._json(200, results[(page - 1) * page_size:page * page_size], headers)
+
+    do_GET = _handle
+    do_HEAD = _handle
+    do_DELETE = _handle
+
+def serve(dataset, behaviour, host="127.0.0.1", port=0):
+    """Starts the server on a background thread and returns it (port 0 picks a free one)."""
+    handler = type("BoundHandler", (Handler,), {"dataset": dataset, "behaviour": behaviour})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def add_behaviour_args(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, help="Requests allowed per window before 429s (sends X-RateLimit-* headers)")
+    parser.add_argument("--rate-window", type=float, default=1.0, help="Rate limit window in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a random 429")
+    parser.add_argument("--retry-after", type=int, help="Retry-After value sent with 429s (default: none)")
+    parser.add_argument("--page-size", type=int, default=30, help="Default page size of the packages API")
+    parser.add_argument("--catalog-page-size", type=int, help="Most image names the catalog returns per page, whatever n asks for")
+
+def behaviour_from_args(args):
+    return Behaviour(args.latency, args.rate_limit, args.rate_window, args.error_rate, args.retry_after, args.page_size,
+                     args.catalog_page_size)
+
+def behaviour_argv(args):
+    """The add_behaviour_args options of `args`, as a command line for running this module standalone."""
+    argv = ["--latency", str(args.latency), "--rate-window", str(args.rate_window),
+            "--error-rate", str(args.error_rate), "--page-size", str(args.page_size)]
+    for option, value in (("--rate-limit", args.rate_limit), ("--retry-after", args.retry_after),
+                          ("--catalog-page-size", args.catalog_page_size)):
+        if value is not None:
+            argv += [option, str(value)]
+    return argv
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Cloudsmith registry + packages API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--tags", type=int, default=3)
+    parser.add_argument("--platforms", type=int, default=3)
+    parser.add_argument("--untagged", type=int, default=2)
+    parser.add_argument("--single", type=int, default=0, help="Single-platform (image manifest) tags per image")
+    add_behaviour_args(parser)
+    args = parser.parse_args()
+
+    server = serve(Dataset(args.images, args.tags, args.platforms, args.untagged, args.single), behaviour_from_args(args), port=args.port)
+    # run_bench.py reads the URL from this line
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]} (CLOUDSMITH_URL and CLOUDSMITH_API_URL)", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Benchmarks multiarch.py against the local fake registry.
+
+Each scenario gets a fresh fake dataset and a cold cache directory, runs the
+script as a subprocess with CLOUDSMITH_URL/CLOUDSMITH_API_URL pointed at the
+fake, and reports wall time, requests served, peak RSS of the script and the
+number of 429s it had to retry through. The startup-* scenarios scan a single
+tiny image many times, so their (median) wall time is dominated by interpreter
+start, imports and argument parsing.
+
+The fake runs in a process of its own. On Linux a child's ru_maxrss starts
+from its parent's high-water mark, so serving the dataset from this process
+would put a floor under every peak RSS reported.
+
+    python3 run_bench.py                       # all scenarios
+    python3 run_bench.py tags-500 --latency 0.05 --engine async
+    python3 run_bench.py --rate-limit 200 --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from fake_registry import add_behaviour_args, behaviour_argv
+
+FAKE_REGISTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_registry.py")
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "multiarch.py")
+
+TINY = {"images": 1, "tags": 1, "platforms": 1, "untagged": 0}
+
+# name -> (dataset kwargs, multiarch.py arguments after org/repo, runs)
+SCENARIOS = {
+    "tags-500": ({"images": 1, "tags": 500, "platforms": 3, "untagged": 0}, ["img0", "--detailed", "--output", "json"], 1),
+    "images-1000": ({"images": 1000, "tags": 5, "platforms": 3, "untagged": 0}, ["--output", "json"], 1),
+    "untagged-delete-2000": ({"images": 1, "tags": 0, "platforms": 2, "untagged": 2000}, ["img0", "--untagged-delete", "--output", "json"], 1),
+    "startup-json": (TINY, ["img0", "--output", "json"], 20),
+    "startup-table": (TINY, ["img0"], 20),
+}
+
+def run_once(cmd, env, cwd):
+    """Runs the script once; returns (exit code, wall seconds, peak RSS in MB, stderr)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return os.waitstatus_to_exitcode(status), wall, rss_mb, stderr.decode(errors="replace").strip()[-2000:]
+
+def start_fake_registry(dataset_kwargs, args):
+    """Starts fake_registry.py in its own process; returns (process, base URL)."""
+    cmd = [sys.executable, FAKE_REGISTRY, "--port", "0", *behaviour_argv(args)]
+    for key, value in dataset_kwargs.items():
+        cmd += [f"--{key}", str(value)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("Serving on "):
+        proc.kill()
+        raise RuntimeError(f"fake_registry.py didn't start: {line!r}")
+    return proc, line.split()[2]
+
+def run_scenario(name, args):
+    dataset_kwargs, script_args, runs = SCENARIOS[name]
+    registry, base_url = start_fake_registry(dataset_kwargs, args)
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ, CLOUDSMITH_URL=base_url, CLOUDSMITH_API_URL=base_url,
+                       CLOUDSMITH_API_KEY="bench", XDG_CACHE_HOME=os.path.join(workdir, "cache"))
+            cmd = [sys.executable, os.path.abspath(args.script), "bench-org", "bench-repo", *script_args,
+                   "--engine", args.engine, *args.extra]
+            # cwd is the scratch dir so the script's log file doesn't land in the repo
+            samples = [run_once(cmd, env, workdir) for _ in range(runs)]
+        with urllib.request.urlopen(f"{base_url}/_stats") as response:
+            stats = json.load(response)
+    finally:
+        registry.terminate()
+        registry.wait()
+
+    exit_code = next((code for code, *_ in samples if code), 0)
+    return {
+        "scenario": name,
+        "engine": args.engine,
+        "runs": runs,
+        "exit_code": exit_code,
+        "wall_seconds": round(statistics.median(wall for _, wall, _, _ in samples), 3),
+        "requests": stats["requests"] // runs,
+        # Every 429 the script sees costs it one retry
+        "retries": (stats["throttled"] + stats["injected"]) // runs,
+        "peak_rss_mb": round(max(rss for _, _, rss, _ in samples), 1),
+        "by_endpoint": stats["by_endpoint"],
+        "stderr": next((err for code, _, _, err in samples if code), samples[-1][3]),
+    }
+
+def print_report(results):
+    header = f"{'Scenario':<22} {'Engine':<7} {'Wall (s)':>9} {'Requests':>9} {'Retries':>8} {'Peak RSS (MB)':>14}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = f"{r['scenario']:<22} {r['engine']:<7} {r['wall_seconds']:>9.3f} {r['requests']:>9} {r['retries']:>8} {r['peak_rss_mb']:>14.1f}"
+        if r["exit_code"]:
+            line += f"  (exit {r['exit_code']})"
+        print(line)
+    for r in results:
+        if r["exit_code"] and r["stderr"]:
+            print(f"\n{r['scenario']} stderr:\n{r['stderr']}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multiarch.py against a local fake registry")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread")
+    parser.add_argument("--script", default=SCRIPT, help="multiarch.py to run, e.g. an older copy to compare against")
+    parser.add_argument("--json", metavar="FILE", help="Also write results as JSON ('-' for stdout)")
+    parser.add_argument("--extra", nargs=argparse.REMAINDER, default=[],
+                        help="Further arguments passed to multiarch.py (must come last)")
+    add_behaviour_args(parser)
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = [run_scenario(name, args) for name in (args.scenarios or SCENARIOS)]
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+        return
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if any(r["exit_code"] for r in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
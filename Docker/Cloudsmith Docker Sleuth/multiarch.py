@@ -3,38 +3,81 @@
 import sys
 import os
 import json
+import hashlib
 import csv
 import argparse
+import fnmatch
 import urllib.request
-import urllib.error
-from urllib.parse import urlencode
+import http.client
+import queue
+from urllib.parse import urlencode, urljoin, urlsplit, parse_qs
 import concurrent.futures
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
 import time
+import threading
 import logging
+import re
 from datetime import datetime
 
-# Try to import rich
-try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich import box
-    from rich.text import Text
-    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
-except ImportError:
-    print("Error: This script requires the 'rich' library.")
-    print("Please install it using: pip install rich")
-    sys.exit(1)
+# --- Console ---
 
-# --- Configuration & Constants ---
+# rich is only imported once table/progress output is actually used, so
+# machine-readable runs start with nothing but the standard library loaded.
+console = None
+
+def require_rich():
+    """Imports rich into module globals on first use and returns the shared console."""
+    global console, Console, Table, box, Text, Progress, SpinnerColumn, BarColumn, TextColumn
+    if console is not None:
+        return console
+    try:
+        from rich.console import Console
+        from rich.table import Table
+        from rich import box
+        from rich.text import Text
+        from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+    except ImportError:
+        print("Error: This script requires the 'rich' library.")
+        print("Please install it using: pip install rich")
+        sys.exit(1)
+    console = Console()
+    return console
+
+class PlainConsole:
+    """Stands in for the rich console in machine-readable modes: markup stripped, written to stderr."""
+
+    MARKUP = re.compile(r"\[/?[a-z][a-z0-9 _.#-]*\]")
+
+    def print(self, *objects, **kwargs):
+        print(*(self.MARKUP.sub("", str(o)) for o in objects), file=sys.stderr)
 
-console = Console()
+# --- Configuration & Constants ---
 
 # API Config
 CLOUDSMITH_URL = os.environ.get("CLOUDSMITH_URL", "https://docker.cloudsmith.io")
+CLOUDSMITH_API_URL = os.environ.get("CLOUDSMITH_API_URL", "https://api.cloudsmith.io")
 API_KEY = os.environ.get("CLOUDSMITH_API_KEY")
 AUTH_HEADER = {"Authorization": f"Bearer {API_KEY}"} if API_KEY else {}
 
+# Max units of work (and so requests) in flight across the whole scan
+DEFAULT_CONCURRENCY = 50
+
+# Packages requested per page from the Cloudsmith API listing endpoints
+API_PAGE_SIZE = 500
+# Image names requested per page (`n`) from the registry catalog
+CATALOG_PAGE_SIZE = 1000
+
 # --- Logging Setup ---
+
+# Library use only gets these records if it configures logging itself; the
+# CLI sends them to a file via setup_logging().
+logger = logging.getLogger("multiarch_inspector")
+logger.addHandler(logging.NullHandler())
+
 def setup_logging(debug_mode=False):
     log_filename = "multiarch_inspector.log"
     level = logging.DEBUG if debug_mode else logging.INFO
@@ -51,57 +94,1034 @@ def setup_logging(debug_mode=False):
         format='%(asctime)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    return logging.getLogger()
+    return logger
+
+# --- HTTP Connection Pool ---
+
+# Max keep-alive connections per host, shared by all worker threads
+HTTP_POOL_SIZE = 32
+HTTP_TIMEOUT = 60
+HTTP_MAX_REDIRECTS = 5
+
+class ConnectionPool:
+    """Bounded pool of keep-alive connections to a single host."""
+
+    def __init__(self, scheme, host, port, maxsize=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self.opened = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+        # Honour HTTP(S)_PROXY / NO_PROXY the same way urlopen did
+        self.proxy = None
+        proxy_url = urllib.request.getproxies().get(scheme)
+        if proxy_url and not urllib.request.proxy_bypass(host):
+            self.proxy = urlsplit(proxy_url)
+
+    def _new_connection(self):
+        if self.proxy:
+            proxy_port = self.proxy.port or (443 if self.proxy.scheme == 'https' else 80)
+            if self.scheme == 'https':
+                conn = http.client.HTTPSConnection(self.proxy.hostname, proxy_port, timeout=self.timeout)
+                conn.set_tunnel(self.host, self.port)
+            else:
+                conn = http.client.HTTPConnection(self.proxy.hostname, proxy_port, timeout=self.timeout)
+        elif self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self):
+        """Returns (connection, reused). Blocks while all connections are in use."""
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_connection(), False
+        with self._lock:
+            self.reused += 1
+        return conn, True
+
+    def release(self, conn, keep=True):
+        if keep:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class HTTPClient:
+    """Keep-alive HTTP client with one bounded connection pool per host."""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool_for(self, parts):
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(parts.scheme, parts.hostname, port, maxsize=self.pool_size)
+                self._pools[key] = pool
+        return pool
+
+    def _send(self, method, url, headers, body):
+        parts = urlsplit(url)
+        pool = self._pool_for(parts)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        if pool.proxy and pool.scheme == 'http':
+            target = url
+
+        # A reused connection may have been closed by the server while idle;
+        # retry once on a fresh connection in that case.
+        for _ in range(2):
+            conn, reused = pool.acquire()
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                pool.release(conn, keep=False)
+                if reused:
+                    logger.debug(f"Stale pooled connection to {pool.host}, reconnecting: {e}")
+                    continue
+                raise
+            except Exception:
+                pool.release(conn, keep=False)
+                raise
+            pool.release(conn, keep=not response.will_close)
+            return response.status, response.headers, payload
+        raise http.client.HTTPException(f"Connection to {pool.host} failed after reconnect")
+
+    def request(self, method, url, headers=None, body=None):
+        """Performs a request, following redirects. Returns (status, headers, body)."""
+        headers = dict(headers or {})
+        for _ in range(HTTP_MAX_REDIRECTS + 1):
+            status, resp_headers, payload = self._send(method, url, headers, body)
+            location = resp_headers.get('Location')
+            if status in (301, 302, 303, 307, 308) and location and method in ('GET', 'HEAD'):
+                new_url = urljoin(url, location)
+                # Don't leak credentials to a different host
+                if urlsplit(new_url).netloc != urlsplit(url).netloc:
+                    headers.pop('Authorization', None)
+                url = new_url
+                continue
+            return status, resp_headers, payload
+        raise http.client.HTTPException(f"Too many redirects: {url}")
+
+    def resize(self, pool_size):
+        """Sets the per-host pool size. Existing pools are replaced; requests in flight finish on the old ones."""
+        with self._lock:
+            if pool_size == self.pool_size:
+                return
+            self.pool_size = pool_size
+            pools, self._pools = list(self._pools.values()), {}
+        for p in pools:
+            p.close()
+
+    def stats(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        return {
+            f"{p.scheme}://{p.host}:{p.port}": {"opened": p.opened, "reused": p.reused}
+            for p in pools
+        }
+
+    def log_stats(self):
+        for host, counts in self.stats().items():
+            logger.debug(f"HTTP connections to {host}: opened={counts['opened']}, reused={counts['reused']}")
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for p in pools:
+            p.close()
+
+http_client = HTTPClient()
+
+# --- Rate Limiting ---
+
+# Requests held back from the quota on top of the ones already in flight
+RATE_LIMIT_RESERVE = 1
+RATE_LIMIT_MAX_BURST = 10
+RATE_LIMIT_MIN_RATE = 0.1
+
+class TokenBucket:
+    """Token bucket for one host, re-tuned from its X-RateLimit-* headers.
+
+    Until the first response from the host, at most RATE_LIMIT_MAX_BURST
+    requests are in flight; if it never reports a quota the bucket then lets
+    everything through. Otherwise the refill rate is the remaining quota, less
+    the requests already in flight (which the server counts before their
+    responses tell us so), spread over the time left in the window. Requests
+    speed up while there is headroom and slow down as it drains, instead of
+    running into 429s.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.rate = None  # tokens per second; None means unthrottled
+        self.capacity = RATE_LIMIT_MAX_BURST
+        self.tokens = float(RATE_LIMIT_MAX_BURST)
+        self.paused_until = 0.0
+        self.inflight = 0
+        self.probed = False
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a request may be sent; pair with release(). Returns the time spent waiting."""
+        waited = 0.0
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif not self.probed and self.inflight >= RATE_LIMIT_MAX_BURST:
+                    # Quota unknown yet: wait for a response to report it
+                    wait = None
+                elif self.rate is None or self.tokens >= 1:
+                    if self.rate is not None:
+                        self.tokens -= 1
+                    self.inflight += 1
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.rate
+                self._changed.wait(wait)
+                waited += time.monotonic() - now
+
+    def release(self):
+        """Marks a request from acquire() as answered (or failed)."""
+        with self._changed:
+            self.inflight -= 1
+            self._changed.notify_all()
+
+    def update(self, headers):
+        if not self.probed:
+            with self._changed:
+                self.probed = True
+                self._changed.notify_all()
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining = int(remaining)
+            window = float(reset) - time.time()
+        except ValueError:
+            return
+        if window <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            usable = remaining - self.inflight - RATE_LIMIT_RESERVE
+            if usable <= 0:
+                # Quota exhausted for this window; hold everyone until it resets
+                if now + window > self.paused_until:
+                    logger.warning(f"Rate limit reached for {self.host}. Pausing requests for {window:.2f}s")
+                    self.paused_until = now + window
+                self.tokens = 0.0
+                return
+            self.rate = max(RATE_LIMIT_MIN_RATE, usable / window)
+            self.capacity = max(1, min(RATE_LIMIT_MAX_BURST, usable))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Holds every request to this host for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+
+class RateLimiter:
+    """Process-wide limiter that every request goes through (one bucket per host)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(host)
+                self._buckets[host] = bucket
+        return bucket
+
+    def acquire(self, url):
+        return self.bucket(url).acquire()
+
+    def release(self, url):
+        self.bucket(url).release()
+
+    def update(self, url, headers):
+        self.bucket(url).update(headers)
+
+    def pause(self, url, seconds):
+        self.bucket(url).pause(seconds)
+
+rate_limiter = RateLimiter()
+
+# --- Manifest Cache ---
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "cloudsmith-docker-sleuth"
+)
+MANIFEST_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class DiskCache:
+    """JSON files under a cache directory with size-capped LRU eviction.
+
+    Entries are touched on read, and the least recently used are evicted once
+    the cache grows past max_bytes. Subclasses decide how keys map to paths.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        raise NotImplementedError
+
+    def get(self, key):
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                value = json.loads(f.read().decode('utf-8'))
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Discarding unreadable cache entry {path}: {e}")
+            with self._lock:
+                self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        if path is None:
+            return
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Failed to write cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Drop least recently used entries until we're comfortably under the cap
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            evicted += 1
+        logger.debug(f"{type(self).__name__} evicted {evicted} entries ({self._size} bytes remain)")
+
+    def log_stats(self):
+        logger.debug(f"{type(self).__name__}: hits={self.hits}, misses={self.misses}")
+
+class ManifestCache(DiskCache):
+    """Content-addressed cache of manifests fetched by digest.
+
+    A digest-addressed manifest never changes, so a cached body is always valid.
+    """
+
+    def __init__(self, root, max_bytes=MANIFEST_CACHE_MAX_BYTES):
+        super().__init__(os.path.join(root, "manifests"), max_bytes)
+
+    def _path(self, digest):
+        algo, _, hexdigest = (digest or "").partition(':')
+        if not algo.isalnum() or not hexdigest.isalnum():
+            return None
+        return os.path.join(self.root, algo, hexdigest[:2], f"{hexdigest}.json")
+
+class ResponseCache(DiskCache):
+    """Validators (ETag / Docker-Content-Digest) and parsed results for mutable URLs.
+
+    Used for the catalog: the next run sends If-None-Match and reuses the
+    stored result on a 304 or an unchanged content digest. (Tag manifests
+    don't need it; they are fetched by digest through the ManifestCache.)
+    """
+
+    def __init__(self, root, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        super().__init__(os.path.join(root, "responses"), max_bytes)
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+# Configured in main(); None disables caching
+manifest_cache = None
+response_cache = None
+
+# --- Incremental Scan State ---
+
+class ScanState:
+    """Tag → index digest mapping and per-digest status/downloads from the last run.
+
+    Backs --since-state: a tag whose index digest hasn't moved since the state
+    was written is rebuilt from it without fetching its manifest again. Tags
+    whose parent or children were still "In Progress" are always re-fetched.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        # No path keeps the state in memory only (--watch without --since-state)
+        self.path = path
+        self.reused = 0
+        self._images = {}
+        self._lock = threading.Lock()
+
+        try:
+            if path is None:
+                raise FileNotFoundError
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable state file {path}: {e}")
+            data = {}
+        if data.get('version') == self.VERSION:
+            self._images = data.get('images', {})
+
+    @staticmethod
+    def _key(workspace, repo, img):
+        return f"{workspace}/{repo}/{img}"
+
+    def _cached_rows(self, saved, digests, ntag, index, detailed):
+        parent_pkg = index.get_tag(ntag)
+        if not parent_pkg:
+            return None
+        if normalize_digest(parent_pkg.get('version')) != saved['digest']:
+            return None
+
+        if saved.get('status') == "In Progress":
+            return None
+        if any((digests.get(c['digest']) or {}).get('status_str') == "In Progress" for c in saved['children']):
+            return None
+
+        # Status and downloads still come from this run's listing where it has them
+        children_data = [
+            build_digest_row(c['digest'], ntag, c['platform'], index.get_version(c['digest']) or digests.get(c['digest']))
+            for c in saved['children']
+        ]
+        return build_tag_rows(ntag, parent_pkg, children_data, detailed)
+
+    def reuse_tag(self, workspace, repo, img, ntag, index, detailed=False):
+        """Returns the tag's rows rebuilt from the state, or None if it has to be fetched."""
+        with self._lock:
+            image = self._images.get(self._key(workspace, repo, img))
+            saved = image['tags'].get(ntag) if image else None
+            if not saved:
+                return None
+            digests = {c['digest']: image['digests'].get(c['digest']) for c in saved['children']}
+
+        # Outside the lock: index lookups can wait for the listing to finish
+        rows = self._cached_rows(saved, digests, ntag, index, detailed)
+        if rows is not None:
+            with self._lock:
+                self.reused += 1
+        return rows
+
+    def record_tag(self, workspace, repo, img, ntag, parent_pkg, children_data):
+        if not parent_pkg:
+            return
+        with self._lock:
+            image = self._images.setdefault(self._key(workspace, repo, img), {"tags": {}, "digests": {}})
+            image['tags'][ntag] = {
+                "digest": normalize_digest(parent_pkg.get('version')),
+                "status": parent_pkg.get('status_str', 'Unknown'),
+                "children": [{"digest": d.digest, "platform": d.platform} for d in children_data],
+            }
+            for d in children_data:
+                image['digests'][d.digest] = {"status_str": d.status, "downloads": d.downloads}
+
+    def prune(self, workspace, repo, img, tags):
+        """Forgets tags (and their digests) that no longer exist for the image."""
+        with self._lock:
+            image = self._images.get(self._key(workspace, repo, img))
+            if not image:
+                return
+            live = set(tags)
+            image['tags'] = {t: v for t, v in image['tags'].items() if t in live}
+            referenced = {c['digest'] for v in image['tags'].values() for c in v['children']}
+            image['digests'] = {d: v for d, v in image['digests'].items() if d in referenced}
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps({"version": self.VERSION, "images": self._images}, separators=(',', ':'))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved scan state to {self.path} ({self.reused} tags reused this run)")
+
+# Configured in main() from --since-state
+scan_state = None
+
+# --- Delete Plans ---
+
+class DeletePlan:
+    """Deletions selected by a --plan run, written out instead of executed.
+
+    One entry per manifest list (workspace, repo, image, tag, slug, digest),
+    for a later --apply run to carry out.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, workspace, repo, img, parents):
+        """Records the parent rows of manifest lists to delete; returns their slugs."""
+        planned = set()
+        with self._lock:
+            for row in parents:
+                if not row.slug:
+                    continue
+                self._entries[row.slug] = {"workspace": workspace, "repo": repo, "image": img,
+                                           "tag": row.tag, "slug": row.slug, "digest": row.digest}
+                planned.add(row.slug)
+        return planned
+
+    def save(self):
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: (e['workspace'], e['repo'], e['image'], e['tag'], e['slug']))
+        data = json.dumps({"version": self.VERSION, "deletions": entries}, indent=2)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Wrote {len(entries)} planned deletions to {self.path}")
+
+    @classmethod
+    def load(cls, path):
+        """Returns the deletion entries of a plan file; raises OSError/ValueError if unusable."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get('version') != cls.VERSION:
+            raise ValueError("not a delete plan written by --plan")
+        return data.get('deletions', [])
+
+class DeleteJournal:
+    """Append-only log of the deletes an --apply run has completed.
+
+    One JSON line per finished delete, flushed as it happens, so rerunning
+    the same plan after a crash or a 429 storm skips slugs already deleted.
+    Completed slugs are read on construction; the journal is open for
+    record() only inside a `with` block.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._file = None
+        self._torn = False
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Last line of an interrupted run
+                    if record.get('status') == "deleted":
+                        self.done.add(record.get('slug'))
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._torn:
+            self._file.write("\n")
+            self._file.flush()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def record(self, slug, success):
+        line = json.dumps({"slug": slug, "status": "deleted" if success else "failed", "time": round(time.time(), 3)})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            if success:
+                self.done.add(slug)
+
+# Configured in main() from --plan
+delete_plan = None
+
+# --- Profiling ---
+
+def endpoint_class(method, url):
+    """Groups a request URL into the endpoint buckets reported by --profile."""
+    parts = urlsplit(url)
+    if parts.path.endswith('/_catalog'):
+        return "registry catalog"
+    if '/manifests/' in parts.path:
+        return "registry manifest (digest)" if '/manifests/sha256:' in parts.path else "registry manifest (tag)"
+    if '/v1/packages/' in parts.path:
+        if method == 'DELETE':
+            return "api package delete"
+        query = parse_qs(parts.query).get('query', [''])[0]
+        return "api package lookup" if query.startswith('version:') else "api package list"
+    return "other"
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+class Profiler:
+    """Request and stage timings collected for --profile.
+
+    Off by default; every hook returns straight away unless `enabled` is set,
+    so an unprofiled run pays for nothing but the flag check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._requests = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def start(self):
+        self.enabled = True
+        self._started = time.perf_counter()
+
+    def record_request(self, endpoint, seconds, nbytes, retries, waited):
+        with self._lock:
+            stats = self._requests.setdefault(endpoint, {"latencies": [], "bytes": 0, "retries": 0, "rate_limit_wait": 0.0})
+            stats["latencies"].append(seconds)
+            stats["bytes"] += nbytes
+            stats["retries"] += retries
+            stats["rate_limit_wait"] += waited
+
+    def record_stage(self, name, seconds):
+        with self._lock:
+            self._stages.setdefault(name, []).append(seconds)
+
+    def stage(self, name):
+        """Decorator timing each call of a (sync or async) stage function under `name`."""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.record_stage(name, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record_stage(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def report(self):
+        """Summary as a JSON-serializable dict (latencies in milliseconds)."""
+        def summarize(values):
+            values = sorted(values)
+            return {
+                "calls": len(values),
+                "total_s": round(sum(values), 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+            }
 
-# Initialize with default INFO level, will be re-initialized in main
-logger = setup_logging()
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in sorted(self._requests.items()):
+                endpoints[endpoint] = {
+                    **summarize(stats["latencies"]),
+                    "bytes": stats["bytes"],
+                    "retries": stats["retries"],
+                    "rate_limit_wait_s": round(stats["rate_limit_wait"], 3),
+                }
+            stages = {name: summarize(durations) for name, durations in sorted(self._stages.items())}
+
+        return {
+            "wall_s": round(time.perf_counter() - self._started, 3),
+            "requests": sum(e["calls"] for e in endpoints.values()),
+            "bytes": sum(e["bytes"] for e in endpoints.values()),
+            "retries": sum(e["retries"] for e in endpoints.values()),
+            "rate_limit_wait_s": round(sum(e["rate_limit_wait_s"] for e in endpoints.values()), 3),
+            "endpoints": endpoints,
+            "stages": stages,
+        }
+
+profiler = Profiler()
+
+# --- Request Coalescing ---
+
+# How long a content-addressed GET result is reused within a run, and how many are kept
+REQUEST_MEMO_TTL = 60
+REQUEST_MEMO_MAX_ENTRIES = 10000
+
+DIGEST_VERSION_QUERY = re.compile(r"version:(sha256:)?[0-9a-f]{64}")
+
+def content_addressed(url):
+    """True for GETs whose answer is pinned by a digest: manifests by digest and version:<digest> package lookups."""
+    parts = urlsplit(url)
+    if "/manifests/sha256:" in parts.path:
+        return True
+    return bool(DIGEST_VERSION_QUERY.fullmatch(parse_qs(parts.query).get('query', [''])[0]))
+
+class SingleFlight:
+    """Coalesces identical GETs issued while one is already in flight.
+
+    Callers asking for a key that is being fetched wait for that call and share
+    its result instead of sending their own. With memoize, a successful result
+    is also kept for REQUEST_MEMO_TTL seconds so later callers in the same run
+    skip the network entirely; only content-addressed lookups are memoized, so
+    listings are always re-read. Results are shared objects and must not be
+    mutated.
+    """
+
+    def __init__(self, ttl=REQUEST_MEMO_TTL, max_entries=REQUEST_MEMO_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.coalesced = 0
+        self.memo_hits = 0
+        self._inflight = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, memoize=False):
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] > time.monotonic():
+                self.memo_hits += 1
+                return memo[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            call.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if memoize and result is not None:
+                self._remember(key, result)
+        call.set_result(result)
+        return result
+
+    def _remember(self, key, result):
+        now = time.monotonic()
+        if len(self._memo) >= self.max_entries:
+            self._memo = {k: v for k, v in self._memo.items() if v[0] > now}
+            # Still full: drop the oldest entries (dicts keep insertion order)
+            for k in list(self._memo)[:len(self._memo) - self.max_entries + 1]:
+                del self._memo[k]
+        self._memo[key] = (now + self.ttl, result)
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+    def log_stats(self):
+        logger.debug(f"SingleFlight: coalesced={self.coalesced}, memo_hits={self.memo_hits}")
+
+request_coalescer = SingleFlight()
+
+# --- Scheduler ---
+
+# Work-queue priorities, lowest first. Deeper work goes ahead of new images so
+# images already started finish instead of every image advancing a little.
+PRIORITY_DELETE = 0
+PRIORITY_DIGEST = 1
+PRIORITY_TAG = 2
+PRIORITY_IMAGE = 3
+
+class Scheduler:
+    """One bounded pool of worker threads fed from a priority work queue.
+
+    The threaded engine submits every unit of work here (images, tags, child
+    digests, deletes), so --concurrency bounds the whole scan instead of each
+    nested pool getting its own threads. A task waiting on work it submitted
+    runs queued tasks of higher priority on its own thread meanwhile (see
+    as_completed), which keeps parents from holding every worker while their
+    children sit in the queue.
+    """
+
+    def __init__(self, workers=DEFAULT_CONCURRENCY):
+        self.workers = max(1, workers)
+        self._queue = []
+        self._seq = itertools.count()
+        self._threads = []
+        self._closed = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._done = threading.Condition(self._lock)
+
+    def submit(self, priority, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.add_done_callback(self._notify_done)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            heapq.heappush(self._queue, (priority, next(self._seq), future, fn, args, kwargs))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"scheduler-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._work.notify()
+            # Waiting tasks may be able to help with it
+            self._done.notify_all()
+        return future
+
+    def _notify_done(self, _future):
+        with self._lock:
+            self._done.notify_all()
+
+    def _run(self, item):
+        priority, _, future, fn, args, kwargs = item
+        if not future.set_running_or_notify_cancel():
+            return
+        outer = getattr(self._local, 'priority', None)
+        self._local.priority = priority
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:  # noqa: BLE001 - re-raised by future.result() in whoever waits on it
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._local.priority = outer
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._work.wait()
+                if not self._queue:
+                    return
+                item = heapq.heappop(self._queue)
+            self._run(item)
+
+    def as_completed(self, futures):
+        """Yields futures as they finish, running more urgent queued work while waiting."""
+        level = getattr(self._local, 'priority', None)
+        pending = list(futures)
+        while pending:
+            item = None
+            with self._lock:
+                done = [f for f in pending if f.done()]
+                if not done:
+                    # Only strictly higher-priority work, so waits can't form a cycle
+                    if self._queue and (level is None or self._queue[0][0] < level):
+                        item = heapq.heappop(self._queue)
+                    else:
+                        self._done.wait()
+            if item is not None:
+                self._run(item)
+                continue
+            finished = set(done)
+            pending = [f for f in pending if f not in finished]
+            yield from done
+
+    def gather(self, futures):
+        """Waits for all futures and returns their results in submission order."""
+        for _ in self.as_completed(futures):
+            pass
+        return [f.result() for f in futures]
+
+    def shutdown(self, cancel_pending=False):
+        with self._lock:
+            self._closed = True
+            dropped = []
+            if cancel_pending:
+                dropped, self._queue = self._queue, []
+            self._work.notify_all()
+        # Outside the lock: cancelling runs the done callbacks, which take it
+        for item in dropped:
+            item[2].cancel()
+
+# Replaced by configure() to apply --concurrency
+scheduler = Scheduler()
 
 # --- Helper Functions ---
 
+# Returned by make_request for a 304 response to a conditional request
+NOT_MODIFIED = object()
+
 def make_request(url, headers=None, method='GET', data=None, return_headers=False):
-    """Performs an HTTP request and returns parsed JSON. Handles rate limiting."""
+    """Performs an HTTP request and returns parsed JSON. Handles rate limiting.
+
+    Identical GETs share one network call (see SingleFlight).
+    """
     if headers is None:
         headers = {}
-    
+
+    if method == 'GET' and data is None:
+        key = (url, tuple(sorted(headers.items())), return_headers)
+        return request_coalescer.do(key, lambda: _send_request(url, headers, method, data, return_headers),
+                                    memoize=content_addressed(url))
+    result = _send_request(url, headers, method, data, return_headers)
+    if method == 'DELETE':
+        # A memoized version:<digest> lookup may describe the package just deleted
+        request_coalescer.clear()
+    return result
+
+def _send_request(url, headers, method, data, return_headers):
     final_headers = {**AUTH_HEADER, **headers}
-    
-    req = urllib.request.Request(url, headers=final_headers, method=method)
-    if data:
-        req.data = data.encode('utf-8')
+    body = data.encode('utf-8') if data else None
+
+    # Totals across attempts, reported by --profile
+    elapsed = 0.0
+    waited = 0.0
+    transferred = len(body) if body else 0
+    retries = 0
 
     max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            with urllib.request.urlopen(req) as response:
-                # Proactive Rate Limit Handling via Headers
-                # https://docs.cloudsmith.com/api/rate-limits#monitoring-your-usage
-                remaining = response.headers.get('X-RateLimit-Remaining')
-                if remaining is not None and int(remaining) < 3:
-                    reset = response.headers.get('X-RateLimit-Reset')
-                    if reset:
-                        wait = float(reset) - time.time()
-                        if wait > 0 and wait < 30: # Only sleep if wait is reasonable
-                            logger.warning(f"Rate limit approaching. Sleeping for {wait:.2f}s")
-                            time.sleep(wait + 0.5)
+    try:
+        for attempt in range(max_retries):
+            waited += rate_limiter.acquire(url)
+            start = time.perf_counter()
+            try:
+                status, resp_headers, payload = http_client.request(method, url, final_headers, body)
+            except Exception as e:
+                logger.error(f"Request Error: {e} - URL: {url}")
+                return None
+            finally:
+                elapsed += time.perf_counter() - start
+                rate_limiter.release(url)
+            transferred += len(payload)
 
-                if method == 'DELETE':
-                    logger.info(f"DELETE Success: {url}")
-                    return True
-                
-                resp_data = json.loads(response.read().decode('utf-8'))
-                if return_headers:
-                    return resp_data, response.headers
-                return resp_data
+            # Re-tune the shared limiter from the quota headers
+            # https://docs.cloudsmith.com/api/rate-limits#monitoring-your-usage
+            rate_limiter.update(url, resp_headers)
 
-        except urllib.error.HTTPError as e:
-            if e.code == 429:
+            if status == 429:
                 # Rate limited - wait and retry
-                retry_after = e.headers.get('Retry-After')
+                retry_after = resp_headers.get('Retry-After')
                 if retry_after:
                     wait_time = float(retry_after)
                 else:
                     # Fallback to X-RateLimit-Reset
-                    reset = e.headers.get('X-RateLimit-Reset')
+                    reset = resp_headers.get('X-RateLimit-Reset')
                     if reset:
                         wait_time = float(reset) - time.time()
                     else:
@@ -109,20 +1129,44 @@ def make_request(url, headers=None, method='GET', data=None, return_headers=Fals
                 
                 if wait_time < 0: wait_time = 1
                 logger.warning(f"Rate Limited (429). Retrying in {wait_time:.2f}s. URL: {url}")
-                time.sleep(wait_time + 0.5)
+                # Hold every worker, not just this one, until the window resets
+                rate_limiter.pause(url, wait_time + 0.5)
+                retries += 1
                 continue
-            elif e.code == 404:
+            elif status == 304:
+                # Only seen when the caller sent a conditional request
+                if return_headers:
+                    return NOT_MODIFIED, resp_headers
+                return NOT_MODIFIED
+            elif status == 404:
+                if method == 'DELETE':
+                    # Already gone (e.g. deleted by an earlier, interrupted run)
+                    logger.info(f"DELETE target already gone: {url}")
+                    return True
                 logger.debug(f"404 Not Found: {url}")
                 return None
-            else:
-                logger.error(f"HTTP Error {e.code}: {url}")
+            elif status >= 400:
+                logger.error(f"HTTP Error {status}: {url}")
                 return None
-        except Exception as e:
-            logger.error(f"Request Error: {e} - URL: {url}")
-            return None
-    
-    logger.error(f"Max retries exceeded for: {url}")
-    return None
+
+            if method == 'DELETE':
+                logger.info(f"DELETE Success: {url}")
+                return True
+
+            try:
+                resp_data = json.loads(payload.decode('utf-8'))
+            except ValueError as e:
+                logger.error(f"Request Error: {e} - URL: {url}")
+                return None
+            if return_headers:
+                return resp_data, resp_headers
+            return resp_data
+        
+        logger.error(f"Max retries exceeded for: {url}")
+        return None
+    finally:
+        if profiler.enabled:
+            profiler.record_request(endpoint_class(method, url), elapsed, transferred, retries, waited)
 
 def find_key_recursive(obj, key):
     """Recursively searches for a key in a dictionary/list and returns a list of values."""
@@ -146,104 +1190,235 @@ def format_status(status_str):
     if status_str == "Failed": return f"[bold red]{status_str}[/bold red] ❌"
     return status_str
 
-def batch_delete_packages(workspace, repo, slugs):
-    """Deletes a list of package slugs in batches to respect rate limits."""
-    deleted = set()
-    failed = set()
+def iter_deletes(workspace, repo, slugs):
+    """Deletes package slugs on the scheduler, paced by the shared rate limiter; yields (slug, success) as each completes."""
     if not slugs:
-        return deleted, failed
-        
+        return
+
     logger.info(f"Starting batch deletion for {len(slugs)} packages.")
-    batch_size = 10
     def delete_pkg_task(slug):
-        del_url = f"https://api.cloudsmith.io/v1/packages/{workspace}/{repo}/{slug}/"
+        del_url = f"{packages_api_url(workspace, repo)}{slug}/"
         return slug, make_request(del_url, method='DELETE')
 
-    for i in range(0, len(slugs), batch_size):
-        batch = slugs[i:i + batch_size]
-        with concurrent.futures.ThreadPoolExecutor(max_workers=batch_size) as executor:
-            futures = [executor.submit(delete_pkg_task, slug) for slug in batch]
-            for future in concurrent.futures.as_completed(futures):
-                slug, success = future.result()
-                if success:
-                    deleted.add(slug)
-                    logger.info(f"Deleted package slug: {slug}")
-                else:
-                    failed.add(slug)
-                    logger.error(f"Failed to delete package slug: {slug}")
-        
-        if i + batch_size < len(slugs):
-            time.sleep(1.1)
-            
+    futures = [scheduler.submit(PRIORITY_DELETE, delete_pkg_task, slug) for slug in slugs]
+    try:
+        for future in scheduler.as_completed(futures):
+            slug, success = future.result()
+            if success:
+                logger.info(f"Deleted package slug: {slug}")
+            else:
+                logger.error(f"Failed to delete package slug: {slug}")
+            yield slug, bool(success)
+    finally:
+        # Closed early (or failed): deletes still queued don't run
+        for future in futures:
+            future.cancel()
+
+@profiler.stage("batch_delete_packages")
+def batch_delete_packages(workspace, repo, slugs, on_result=None):
+    """Deletes a list of package slugs; returns (deleted, failed) sets.
+
+    on_result(slug, success) is called as each delete completes.
+    """
+    deleted = set()
+    failed = set()
+    for slug, success in iter_deletes(workspace, repo, slugs):
+        (deleted if success else failed).add(slug)
+        if on_result is not None:
+            on_result(slug, success)
     return deleted, failed
 
-# --- Core Logic ---
+def apply_plan(entries, journal):
+    """Deletes every planned slug not yet in the journal; returns (deleted, failed, skipped)."""
+    by_repo = {}
+    skipped = 0
+    for entry in entries:
+        if entry['slug'] in journal.done:
+            skipped += 1
+            continue
+        by_repo.setdefault((entry['workspace'], entry['repo']), []).append(entry['slug'])
+    if skipped:
+        logger.info(f"Skipping {skipped} deletions already recorded in {journal.path}")
 
-def get_digest_data(workspace, repo, img, digest, ntag_display, platform="unknown"):
-    """Fetches data for a specific digest (child image) and returns data dict."""
-    
-    # 1. Fetch Manifest to get Architecture (Only if unknown)
-    if platform == "unknown":
-        manifest_url = f"{CLOUDSMITH_URL}/v2/{workspace}/{repo}/{img}/manifests/{digest}"
-        manifest_json = make_request(manifest_url, {"Accept": "application/vnd.oci.image.manifest.v2+json", "Cache-Control": "no-cache"})
-        
-        if manifest_json:
-            if 'manifests' in manifest_json:
-                found = False
-                for m in manifest_json['manifests']:
-                    if m.get('digest') == digest:
-                        p = m.get('platform', {})
-                        platform = f"{p.get('os', '')}/{p.get('architecture', '')}"
-                        found = True
-                        break
-                if not found:
-                    archs = find_key_recursive(manifest_json, 'architecture')
-                    if archs: platform = archs[0]
-            else:
-                archs = find_key_recursive(manifest_json, 'architecture')
-                if archs: platform = archs[0]
+    deleted = set()
+    failed = set()
+    for (workspace, repo), slugs in by_repo.items():
+        d, f = batch_delete_packages(workspace, repo, slugs, on_result=journal.record)
+        deleted |= d
+        failed |= f
+    return deleted, failed, skipped
+
+class PackageIndex:
+    """In-memory index of a package listing, keyed by version (digest) and by tag.
+
+    Built from the paginated package listing so digest and tag lookups can be
+    answered without a separate API call each. Lookups return None on a miss,
+    in which case callers fall back to querying the API directly. Whoever fills
+    the index must call mark_complete() once the listing is done, since lookups
+    that miss before then wait for it.
+    """
+
+    def __init__(self):
+        self._by_version = {}
+        self._by_tag = {}
+        self._lock = threading.Lock()
+        self._complete = threading.Event()
+        self._async_waiter = None
+
+    def add(self, pkg):
+        entry = package_entry(pkg)
+        version = entry['version']
+        with self._lock:
+            if version:
+                self._by_version[version.replace("sha256:", "")] = entry
+            for t in (pkg.get('tags') or {}).get('version') or []:
+                self._by_tag.setdefault(t, entry)
+
+    def add_all(self, packages):
+        for pkg in packages or []:
+            self.add(pkg)
+
+    def mark_complete(self):
+        """Signals that the listing has been fully paged in."""
+        self._complete.set()
+
+    @property
+    def complete(self):
+        return self._complete.is_set()
+
+    async def wait_complete_async(self):
+        """Waits for mark_complete() without blocking the event loop."""
+        if self._complete.is_set():
+            return
+        if self._async_waiter is None:
+            self._async_waiter = asyncio.get_running_loop().run_in_executor(None, self._complete.wait)
+        await asyncio.shield(self._async_waiter)
+
+    def _lookup(self, table, key, wait=True):
+        with self._lock:
+            entry = table.get(key)
+        # While the listing is still being paged a miss may only mean "not yet";
+        # wait for the last page before letting the caller go to the network.
+        if entry is None and wait and not self._complete.is_set():
+            self._complete.wait()
+            with self._lock:
+                entry = table.get(key)
+        return entry
+
+    async def _lookup_async(self, table, key):
+        entry = self._lookup(table, key, wait=False)
+        if entry is None and not self._complete.is_set():
+            await self.wait_complete_async()
+            entry = self._lookup(table, key, wait=False)
+        return entry
+
+    def get_version(self, digest, wait=True):
+        return self._lookup(self._by_version, digest.replace("sha256:", ""), wait)
+
+    def get_tag(self, tag, wait=True):
+        return self._lookup(self._by_tag, tag, wait)
+
+    async def get_version_async(self, digest):
+        """get_version for coroutines: only a miss waits, and without blocking the loop."""
+        return await self._lookup_async(self._by_version, digest.replace("sha256:", ""))
+
+    async def get_tag_async(self, tag):
+        return await self._lookup_async(self._by_tag, tag)
+
+    def __len__(self):
+        return len(self._by_version)
+
+# --- Response Extraction ---
+# The packages API and registry return a handful of known shapes; read the
+# fields the scan needs straight out of those and only walk the whole tree
+# (find_key_recursive) for shapes nobody has seen yet.
+
+def package_entry(pkg):
+    """The fields the scan uses from one packages-API result."""
+    return {
+        "version": pkg.get('version') or '',
+        "status_str": pkg.get('status_str', 'Unknown'),
+        "downloads": pkg.get('downloads', 0) or 0,
+        "slug": pkg.get('slug', ''),
+        # "manifest/list" or "image"; tells a single-platform tag from a multi-arch one
+        "type_display": pkg.get('type_display') or '',
+    }
 
-    # 2. Get Package Data from API
+def package_from_listing(packages, digest):
+    """Returns the package_entry for digest from a packages-API list response, or None if it isn't there."""
     version = digest.replace("sha256:", "")
-    api_url = f"https://api.cloudsmith.io/v1/packages/{workspace}/{repo}/?query=version:{version}"
-    pkg_details = make_request(api_url, {"Cache-Control": "no-cache"})
-    
-    status_raw = "Unknown"
-    dl = 0
-    
-    if pkg_details:
-        statuses = set(find_key_recursive(pkg_details, 'status_str'))
-        if statuses:
-            status_raw = " ".join(sorted(list(statuses)))
-
-        downloads = find_key_recursive(pkg_details, 'downloads')
-        if len(downloads) >= 2:
-             dl = downloads[0]
-        elif len(downloads) > 0:
-            dl = downloads[0]
+    if isinstance(packages, list) and all(isinstance(p, dict) for p in packages):
+        if not packages:
+            return None
+        # A version: query can match more than the one package; prefer the exact digest
+        pkg = next((p for p in packages if (p.get('version') or '').replace("sha256:", "") == version), packages[0])
+        return package_entry(pkg)
 
+    logger.warning(f"Unrecognised package listing for {digest}; falling back to a recursive key search")
+    statuses = find_key_recursive(packages, 'status_str')
+    downloads = find_key_recursive(packages, 'downloads')
     return {
-        "tag": ntag_display,
-        "type": "image",
-        "platform": platform,
-        "status": status_raw,
-        "downloads": dl,
-        "digest": digest,
-        "is_child": True
+        "version": version,
+        "status_str": " ".join(sorted(set(statuses))) or "Unknown",
+        "downloads": downloads[0] if downloads else 0,
+        "slug": "",
     }
 
-def fetch_tag_data(workspace, repo, img, ntag, detailed=False):
-    """Fetches the manifest list for a tag and returns a list of data dicts."""
-    
-    manifest_url = f"{CLOUDSMITH_URL}/v2/{workspace}/{repo}/{img}/manifests/{ntag}"
-    manifest_json = make_request(manifest_url, {"Accept": "application/vnd.oci.image.manifest.v1+json", "Cache-Control": "no-cache"})
-    
-    if not manifest_json:
-        return []
+def manifest_kind(manifest_json):
+    """'index' (manifest list / OCI index), 'image' (image manifest) or None for an unknown shape."""
+    if not isinstance(manifest_json, dict):
+        return None
+    if isinstance(manifest_json.get('manifests'), list):
+        return 'index'
+    if 'config' in manifest_json or 'fsLayers' in manifest_json:
+        return 'image'
+    return None
+
+# --- Core Logic ---
+
+# Accept header sent when fetching a tag's manifest list
+TAG_MANIFEST_ACCEPT = "application/vnd.oci.image.manifest.v1+json"
+
+def packages_api_url(workspace, repo):
+    return f"{CLOUDSMITH_API_URL}/v1/packages/{workspace}/{repo}/"
+
+def manifest_url(workspace, repo, img, reference):
+    return f"{CLOUDSMITH_URL}/v2/{workspace}/{repo}/{img}/manifests/{reference}"
 
-    # Parse out digests and platforms
+def next_page_url(headers):
+    """Returns the rel="next" URL from a Link header, if any."""
+    link_header = headers.get('Link')
+    if link_header:
+        links = link_header.split(',')
+        for link in links:
+            if 'rel="next"' in link:
+                # Format: <url>; rel="next"
+                return link.split(';')[0].strip('<> ')
+    return None
+
+def resolve_platform(manifest_json, digest, platform="unknown"):
+    """Works out a child digest's os/arch from its manifest."""
+    if manifest_json:
+        kind = manifest_kind(manifest_json)
+        if kind == 'index':
+            for m in manifest_json['manifests']:
+                if m.get('digest') == digest:
+                    p = m.get('platform', {})
+                    return f"{p.get('os', '')}/{p.get('architecture', '')}"
+        elif kind == 'image':
+            # Only schema 1 manifests carry it; OCI / schema 2 keep it in the config blob
+            platform = manifest_json.get('architecture') or platform
+        else:
+            logger.warning(f"Unrecognised manifest shape for {digest}; falling back to a recursive key search")
+            archs = find_key_recursive(manifest_json, 'architecture')
+            if archs: platform = archs[0]
+    return platform
+
+def parse_index_children(manifest_json):
+    """Returns the platform child digests listed in a tag's manifest list."""
     children = []
-    if 'manifests' in manifest_json:
+    kind = manifest_kind(manifest_json)
+    if kind == 'index':
         for m in manifest_json['manifests']:
             d = m.get('digest')
             p = m.get('platform', {})
@@ -253,73 +1428,18 @@ def fetch_tag_data(workspace, repo, img, ntag, detailed=False):
             
             if d and arch.lower() != 'unknown':
                 children.append({'digest': d, 'platform': plat})
+    elif kind == 'image':
+        # A single-platform image: its config and layer digests aren't packages
+        logger.debug("Tag points at an image manifest, not a manifest list; no children")
     else:
-        # Fallback
+        logger.warning("Unrecognised tag manifest shape; falling back to a recursive digest search")
         digests = list(set(find_key_recursive(manifest_json, 'digest')))
         for d in digests:
              children.append({'digest': d, 'platform': 'unknown'})
+    return children
 
-    if not children:
-        return []
-
-    # Process children
-    children_data = []
-    total_downloads = 0
-    
-    for child in children:
-        data = get_digest_data(workspace, repo, img, child['digest'], ntag, platform=child['platform'])
-        children_data.append(data)
-        total_downloads += data['downloads']
-
-    # Fetch parent package info
-    api_url = f"https://api.cloudsmith.io/v1/packages/{workspace}/{repo}/?query=version:{ntag}"
-    pkg_details = make_request(api_url, {"Cache-Control": "no-cache"})
-    
-    parent_status = "Unknown"
-    index_digest = ""
-    slug = ""
-    
-    if pkg_details and len(pkg_details) > 0:
-        parent_status = pkg_details[0].get('status_str', 'Unknown')
-        slug = pkg_details[0].get('slug', '')
-        ver = pkg_details[0].get('version', '')
-        if ver and not ver.startswith('sha256:'):
-            index_digest = f"sha256:{ver}"
-        else:
-            index_digest = ver
-
-    results = []
-    # Parent Data
-    results.append({
-        "tag": ntag,
-        "type": "manifest/list",
-        "platform": "multi",
-        "status": parent_status,
-        "downloads": total_downloads,
-        "digest": index_digest,
-        "is_child": False,
-        "slug": slug
-    })
-
-    # Children Data
-    if detailed:
-        results.extend(children_data)
-
-    return results
-
-def fetch_untagged_data(pkg, workspace, repo, img, detailed=False):
-    digest = pkg.get('version')
-    if digest and not digest.startswith('sha256:'):
-        digest = f"sha256:{digest}"
-    
-    status = pkg.get('status_str')
-    downloads = pkg.get('downloads', 0)
-    slug = pkg.get('slug')
-    
-    # Fetch manifest to get platforms
-    manifest_url = f"{CLOUDSMITH_URL}/v2/{workspace}/{repo}/{img}/manifests/{digest}"
-    manifest_json = make_request(manifest_url, {"Accept": "application/vnd.oci.image.manifest.v1+json", "Cache-Control": "no-cache"})
-    
+def parse_untagged_manifest(manifest_json):
+    """Returns (platform string, child digests) for an untagged manifest list."""
     child_digests = []
     platform_str = "unknown"
 
@@ -339,82 +1459,127 @@ def fetch_untagged_data(pkg, workspace, repo, img, detailed=False):
             archs.add("unknown")
         
         platform_str = " ".join(sorted(list(archs)))
+    return platform_str, child_digests
+
+class Row:
+    """One output row: a manifest list (parent) or one of its platform images (child).
+
+    Slotted because whole-org scans hold hundreds of thousands of these.
+    `slug` and `action` are None when they don't apply and are then left out
+    of the JSON form.
+    """
+
+    __slots__ = ("action", "digest", "downloads", "is_child", "platform", "slug", "status", "tag", "type")
+
+    def __init__(self, tag, row_type, platform, status, downloads, digest, is_child=False, slug=None, action=None):
+        self.tag = tag
+        self.type = row_type
+        self.platform = platform
+        self.status = status
+        self.downloads = downloads
+        self.digest = digest
+        self.is_child = is_child
+        self.slug = slug
+        self.action = action
+
+    def to_dict(self):
+        data = {
+            "tag": self.tag,
+            "type": self.type,
+            "platform": self.platform,
+            "status": self.status,
+            "downloads": self.downloads,
+            "digest": self.digest,
+            "is_child": self.is_child,
+        }
+        if self.slug is not None:
+            data["slug"] = self.slug
+        if self.action is not None:
+            data["action"] = self.action
+        return data
+
+class RowGroup(list):
+    """A parent row followed by its child rows.
+
+    `section_break` asks the table renderer for a rule after the group.
+    """
+
+    __slots__ = ("section_break",)
+
+    def __init__(self, rows=(), section_break=False):
+        super().__init__(rows)
+        self.section_break = section_break
+
+def build_digest_row(digest, ntag_display, platform, entry=None, pkg_details=None):
+    """Builds a child row from an index entry or a raw package-list response."""
+    status_raw = "Unknown"
+    dl = 0
 
-    results = []
-    results.append({
-        "tag": "(untagged)",
-        "type": "manifest/list",
-        "platform": platform_str,
-        "status": status,
-        "downloads": downloads,
-        "digest": digest,
-        "is_child": False,
-        "slug": slug # Internal use
-    })
+    if entry is None and pkg_details:
+        entry = package_from_listing(pkg_details, digest)
+    if entry:
+        status_raw = entry['status_str']
+        dl = entry['downloads']
 
-    if detailed:
-        for child in child_digests:
-            # FIX: get_digest_data returns a dict, not a tuple
-            row = get_digest_data(workspace, repo, img, child['digest'], "(untagged)", platform=child['platform'])
-            results.append(row)
-        results.append("SECTION")
-        
-    return results, slug
+    return Row(ntag_display, "image", platform, status_raw, dl, digest, is_child=True)
 
-def get_untagged_images(workspace, repo, img, delete=False, detailed=False, progress=None):
-    api_url = f"https://api.cloudsmith.io/v1/packages/{workspace}/{repo}/"
-    query = urlencode({'query': f"name:{img}"})
-    full_url = f"{api_url}?{query}"
-    
-    packages = make_request(full_url, {"Cache-Control": "no-cache"})
+def build_tag_rows(ntag, parent_pkg, children_data, detailed=False):
+    """Builds the parent manifest/list row (plus children if detailed) for a tag.
+
+    A tag on a single-platform image manifest gets an "image" parent row with
+    the package's own downloads and no children.
+    """
+    total_downloads = sum(data.downloads for data in children_data)
     
-    untagged_pkgs = []
-    if packages:
-        for p in packages:
-            if p.get('type_display') == 'manifest/list':
-                tags = p.get('tags', {})
-                if not tags.get('version'):
-                    untagged_pkgs.append(p)
-
-    if not untagged_pkgs:
-        return None
+    parent_status = "Unknown"
+    index_digest = ""
+    slug = ""
+    parent_type, parent_platform = "manifest/list", "multi"
     
-    logger.info(f"Found {len(untagged_pkgs)} untagged manifest lists for image: {img}")
+    if parent_pkg:
+        parent_status = parent_pkg.get('status_str', 'Unknown')
+        slug = parent_pkg.get('slug', '')
+        index_digest = normalize_digest(parent_pkg.get('version', ''))
+        if parent_pkg.get('type_display') == 'image':
+            parent_type, parent_platform = "image", "unknown"
+            total_downloads = parent_pkg.get('downloads', 0)
 
-    # Fetch data first
-    results_map = {}
-    packages_to_delete = []
-    
-    task_id = None
-    if progress:
-        task_id = progress.add_task(f"[cyan]Analyzing {img}[/cyan] ({len(untagged_pkgs)} untagged)", total=len(untagged_pkgs))
+    # Parent Data
+    results = RowGroup([Row(ntag, parent_type, parent_platform, parent_status, total_downloads, index_digest, slug=slug)])
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(fetch_untagged_data, pkg, workspace, repo, img, detailed): i for i, pkg in enumerate(untagged_pkgs)}
-        for future in concurrent.futures.as_completed(futures):
-            index = futures[future]
-            try:
-                rows, slug = future.result()
-                results_map[index] = (rows, slug)
-                packages_to_delete.append(slug)
-            except Exception:
-                pass
-            
-            if progress and task_id is not None:
-                progress.advance(task_id)
-    
-    if progress and task_id is not None:
-        progress.remove_task(task_id)
+    # Children Data
+    if detailed:
+        results.extend(children_data)
 
-    # Perform Deletion if requested
-    deleted_slugs = set()
-    failed_slugs = set()
-    if delete and packages_to_delete:
-        deleted_slugs, failed_slugs = batch_delete_packages(workspace, repo, packages_to_delete)
+    return results
 
-    # Build Result Groups
+def build_untagged_parent_row(pkg, digest, platform_str):
+    return Row("(untagged)", "manifest/list", platform_str, pkg.get('status_str'), pkg.get('downloads', 0), digest,
+               slug=pkg.get('slug'))  # slug is internal use, cleared before output
+
+def normalize_digest(version):
+    """Package versions are bare hex digests; rows and manifests use sha256:<hex>."""
+    if version and not version.startswith('sha256:'):
+        return f"sha256:{version}"
+    return version
+
+def untagged_digest(pkg):
+    return normalize_digest(pkg.get('version'))
+
+def select_untagged(packages):
+    """Filters a package listing down to manifest lists without version tags."""
+    untagged_pkgs = []
+    for p in packages or []:
+        if p.get('type_display') == 'manifest/list':
+            tags = p.get('tags', {})
+            if not tags.get('version'):
+                untagged_pkgs.append(p)
+    return untagged_pkgs
+
+def build_untagged_groups(count, results_map, delete, deleted_slugs, failed_slugs, planned_slugs=()):
+    """Orders untagged results and stamps the delete action on every row."""
     groups = []
-    for i in range(len(untagged_pkgs)):
+    for i in range(count):
         if i in results_map:
             rows, slug = results_map[i]
             
@@ -425,228 +1590,1603 @@ def get_untagged_images(workspace, repo, img, delete=False, detailed=False, prog
                     action_str = "Deleted"
                 elif slug in failed_slugs:
                     action_str = "Failed"
+                elif slug in planned_slugs:
+                    action_str = "Planned"
             
             for row in rows:
-                if isinstance(row, dict):
-                    row['action'] = action_str
-                    # Remove internal slug
-                    if 'slug' in row: del row['slug']
+                row.action = action_str
+                # Remove internal slug
+                row.slug = None
             
             groups.append(rows)
-    
     return groups
 
-def get_image_analysis(workspace, repo, img_name, delete_all=False, delete_tag=None, detailed=False, progress=None):
-    # Switch to Cloudsmith API to avoid upstream tags and allow filtering
-    api_url = f"https://api.cloudsmith.io/v1/packages/{workspace}/{repo}/"
-    
-    # Construct query: format:docker AND name:{img_name} (if provided)
-    query_parts = ["format:docker"]
-    if img_name:
-        query_parts.append(f"name:{img_name}")
-    
-    query = urlencode({'query': " AND ".join(query_parts)})
-    next_url = f"{api_url}?{query}"
-    
-    tags = set()
-    
-    # Pagination Loop
-    while next_url:
-        result = make_request(next_url, {"Cache-Control": "no-cache"}, return_headers=True)
-        if not result:
-            break
-            
-        data, headers = result
-        
-        for pkg in data:
-            # pkg['tags'] is a dict like {'version': [...]}
-            version_tags = pkg.get('tags', {}).get('version', [])
-            for t in version_tags:
-                tags.add(t)
-        
-        # Handle Pagination via Link header
-        next_url = None
-        link_header = headers.get('Link')
-        if link_header:
-            links = link_header.split(',')
-            for link in links:
-                if 'rel="next"' in link:
-                    # Format: <url>; rel="next"
-                    next_url = link.split(';')[0].strip('<> ')
-                    break
-
-    sorted_tags = sorted(list(tags))
-
-    if not sorted_tags:
-        logger.info(f"No tags found for image: {img_name}")
-        return None
-
-    groups = []
-    
-    task_id = None
-    if progress:
-        task_id = progress.add_task(f"[cyan]Analyzing {img_name}[/cyan] ({len(sorted_tags)} tags)", total=len(sorted_tags))
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_tag = {executor.submit(fetch_tag_data, workspace, repo, img_name, t, detailed): t for t in sorted_tags}
-        
-        results = {}
-        for future in concurrent.futures.as_completed(future_to_tag):
-            tag = future_to_tag[future]
-            try:
-                results[tag] = future.result()
-            except Exception:
-                pass
-            
-            if progress and task_id is not None:
-                progress.advance(task_id)
-        
-        for t in sorted_tags:
-            if t in results:
-                groups.append(results[t])
-    
-    if progress and task_id is not None:
-        progress.remove_task(task_id)
-
-    # Deletion Logic for Tagged Images
+def tagged_delete_candidates(groups, delete_all=False, delete_tag=None):
+    """Returns the slugs of manifest lists selected by --delete-all / --delete-tag."""
     packages_to_delete = []
     for group in groups:
         if not group: continue
         parent = group[0]
-        # Only delete manifest lists
-        if parent.get('type') == 'manifest/list':
+        # Only delete what a tag points at: manifest lists, or single-platform images
+        if parent.type in ('manifest/list', 'image'):
             should_delete = False
             if delete_all:
                 should_delete = True
-            elif delete_tag and parent.get('tag') == delete_tag:
+            elif delete_tag and parent.tag == delete_tag:
                 should_delete = True
             
-            if should_delete and parent.get('slug'):
-                packages_to_delete.append(parent['slug'])
+            if should_delete and parent.slug:
+                packages_to_delete.append(parent.slug)
+    return packages_to_delete
 
-    if packages_to_delete:
-        logger.info(f"Identified {len(packages_to_delete)} tagged packages to delete for image: {img_name}")
+def planned_parents(groups, slugs):
+    """Parent rows of the groups whose manifest list is in slugs, for the --plan file."""
+    slugs = set(slugs)
+    return [group[0] for group in groups if group and group[0].slug in slugs]
 
-    deleted_slugs = set()
-    failed_slugs = set()
-    if packages_to_delete:
-        deleted_slugs, failed_slugs = batch_delete_packages(workspace, repo, packages_to_delete)
-
-    # Update Action Status in Groups
+def apply_tagged_actions(groups, deleted_slugs, failed_slugs, planned_slugs=()):
+    """Marks rows of deleted (failed, or --plan'ned) manifest lists with their action."""
     for group in groups:
         if not group: continue
         parent = group[0]
-        slug = parent.get('slug')
+        slug = parent.slug
         
         action_str = ""
         if slug in deleted_slugs:
             action_str = "Deleted"
         elif slug in failed_slugs:
             action_str = "Failed"
+        elif slug in planned_slugs:
+            action_str = "Planned"
         
         if action_str:
-            parent['action'] = action_str
-            # Optionally propagate to children if needed, but usually just parent row
+            # Propagated to the children as well
             for row in group:
-                if isinstance(row, dict):
-                    row['action'] = action_str
+                row.action = action_str
+
+def _conditional_prepare(url, headers):
+    """Returns (cached entry, headers) with If-None-Match set from the last run."""
+    entry = response_cache.get(url) if response_cache is not None else None
+    headers = dict(headers)
+    if entry:
+        validator = entry.get('etag') or (f'"{entry["digest"]}"' if entry.get('digest') else None)
+        if validator:
+            headers['If-None-Match'] = validator
+    return entry, headers
+
+def _conditional_finish(url, entry, result, parse):
+    """Turns a conditional response into a parsed result, reusing the cache when unchanged."""
+    if not result:
+        return None
+    data, resp_headers = result
+    if data is NOT_MODIFIED:
+        logger.debug(f"304 Not Modified, reusing cached result: {url}")
+        return entry['parsed']
+
+    digest = resp_headers.get('Docker-Content-Digest')
+    if entry and digest and entry.get('digest') == digest:
+        logger.debug(f"Content digest unchanged, reusing cached result: {url}")
+        return entry['parsed']
+
+    parsed = parse(data) if data else None
+    if response_cache is not None and parsed is not None and (resp_headers.get('ETag') or digest):
+        response_cache.put(url, {"etag": resp_headers.get('ETag'), "digest": digest, "parsed": parsed})
+    return parsed
+
+def fetch_manifest_by_digest(workspace, repo, img, digest, accept):
+    """Fetches a digest-addressed manifest, served from the on-disk cache when possible."""
+    if manifest_cache is not None:
+        cached = manifest_cache.get(digest)
+        if cached is not None:
+            return cached
+
+    manifest_json = make_request(manifest_url(workspace, repo, img, digest), {"Accept": accept, "Cache-Control": "no-cache"})
+    if manifest_json and manifest_cache is not None:
+        manifest_cache.put(digest, manifest_json)
+    return manifest_json
+
+@profiler.stage("get_digest_data")
+def get_digest_data(workspace, repo, img, digest, ntag_display, platform="unknown", index=None):
+    """Fetches data for a specific digest (child image) and returns data dict."""
+    
+    # 1. Fetch Manifest to get Architecture (Only if unknown)
+    if platform == "unknown":
+        manifest_json = fetch_manifest_by_digest(workspace, repo, img, digest, "application/vnd.oci.image.manifest.v2+json")
+        platform = resolve_platform(manifest_json, digest)
+
+    # 2. Get Package Data from the index, falling back to the API on a miss
+    entry = index.get_version(digest) if index is not None else None
+    pkg_details = None
+    if entry is None:
+        version = digest.replace("sha256:", "")
+        api_url = f"{packages_api_url(workspace, repo)}?query=version:{version}"
+        pkg_details = make_request(api_url, {"Cache-Control": "no-cache"})
+
+    return build_digest_row(digest, ntag_display, platform, entry, pkg_details)
+
+@profiler.stage("fetch_tag_data")
+def fetch_tag_data(workspace, repo, img, ntag, detailed=False, index=None, state=None):
+    """Fetches the manifest list for a tag and returns a list of data dicts."""
+    parent_pkg = index.get_tag(ntag) if index is not None else None
+
+    # Aliases (latest, 1, 1.2, ...) share one manifest list; fetching it by digest
+    # lets them coalesce onto a single request and hit the manifest cache.
+    children = None
+    if parent_pkg is not None and parent_pkg.get('version'):
+        manifest_json = fetch_manifest_by_digest(workspace, repo, img, normalize_digest(parent_pkg['version']), TAG_MANIFEST_ACCEPT)
+        children = parse_index_children(manifest_json) if manifest_json else None
+
+    # Otherwise go by tag (only when the listing didn't have it)
+    if children is None:
+        manifest_json = make_request(manifest_url(workspace, repo, img, ntag), {"Accept": TAG_MANIFEST_ACCEPT, "Cache-Control": "no-cache"})
+        children = parse_index_children(manifest_json) if manifest_json else None
+    # An image manifest has no children, but the tag still gets its row
+    if children is None:
+        return []
+
+    # Process children
+    children_data = scheduler.gather([
+        scheduler.submit(PRIORITY_DIGEST, get_digest_data, workspace, repo, img, child['digest'], ntag, platform=child['platform'], index=index)
+        for child in children
+    ])
+
+    # Fetch parent package info from the API if the index didn't have it
+    if parent_pkg is None:
+        api_url = f"{packages_api_url(workspace, repo)}?query=version:{ntag}"
+        pkg_details = make_request(api_url, {"Cache-Control": "no-cache"})
+        if pkg_details and len(pkg_details) > 0:
+            parent_pkg = pkg_details[0]
+
+    if state is not None:
+        state.record_tag(workspace, repo, img, ntag, parent_pkg, children_data)
+
+    return build_tag_rows(ntag, parent_pkg, children_data, detailed)
+
+@profiler.stage("fetch_untagged_data")
+def fetch_untagged_data(pkg, workspace, repo, img, detailed=False, index=None):
+    digest = untagged_digest(pkg)
+    slug = pkg.get('slug')
+    
+    # Fetch manifest to get platforms
+    manifest_json = fetch_manifest_by_digest(workspace, repo, img, digest, "application/vnd.oci.image.manifest.v1+json")
+    platform_str, child_digests = parse_untagged_manifest(manifest_json)
+
+    # Detailed untagged groups are ruled off from each other in the table
+    results = RowGroup([build_untagged_parent_row(pkg, digest, platform_str)], section_break=detailed)
+
+    if detailed:
+        results.extend(scheduler.gather([
+            scheduler.submit(PRIORITY_DIGEST, get_digest_data, workspace, repo, img, child['digest'], "(untagged)", platform=child['platform'], index=index)
+            for child in child_digests
+        ]))
+        
+    return results, slug
+
+def untagged_listing_url(workspace, repo, img):
+    # The API narrows the listing to the image's Docker packages; its query has
+    # no term for package type or for untagged packages, so untagged manifest
+    # lists are picked out client-side. The child images that come along are
+    # indexed for the digest lookups.
+    query = urlencode({'query': f"format:docker AND name:{img}", 'page_size': API_PAGE_SIZE})
+    return f"{packages_api_url(workspace, repo)}?{query}"
+
+def iter_untagged_results(workspace, repo, img, detailed=False, progress=None):
+    """Yields (position, rows, slug) for each untagged manifest list of an image as it resolves.
+
+    `position` is the manifest list's place in the listing, for restoring that order.
+    """
+    next_url = untagged_listing_url(workspace, repo, img)
+
+    # The same listing carries the child image packages, so index it for digest lookups
+    index = PackageIndex()
+
+    futures = {}
+    task_id = None
+
+    # Each page's untagged manifest lists are queued as soon as it arrives
+    try:
+        while next_url:
+            result = make_request(next_url, {"Cache-Control": "no-cache"}, return_headers=True)
+            if not result:
+                break
+
+            data, headers = result
+            index.add_all(data)
+            for pkg in select_untagged(data):
+                futures[scheduler.submit(PRIORITY_TAG, fetch_untagged_data, pkg, workspace, repo, img, detailed, index)] = len(futures)
+
+            if progress and futures:
+                if task_id is None:
+                    task_id = progress.add_task(f"[cyan]Analyzing {img}[/cyan] (untagged)", total=len(futures))
+                else:
+                    progress.update(task_id, total=len(futures))
+
+            next_url = next_page_url(headers)
+    finally:
+        index.mark_complete()
+
+    if not futures:
+        return
+
+    logger.info(f"Found {len(futures)} untagged manifest lists for image: {img}")
+    if progress and task_id is not None:
+        progress.update(task_id, description=f"[cyan]Analyzing {img}[/cyan] ({len(futures)} untagged)")
+
+    try:
+        for future in scheduler.as_completed(futures):
+            try:
+                rows, slug = future.result()
+            except Exception:
+                logger.exception(f"Failed to analyze untagged manifest list {futures[future]} of {img}")
+            else:
+                yield futures[future], rows, slug
+
+            if progress and task_id is not None:
+                progress.advance(task_id)
+    finally:
+        if progress and task_id is not None:
+            progress.remove_task(task_id)
+
+@profiler.stage("get_untagged_images")
+def get_untagged_images(workspace, repo, img, delete=False, detailed=False, progress=None):
+    results_map = {pos: (rows, slug) for pos, rows, slug in iter_untagged_results(workspace, repo, img, detailed, progress)}
+    if not results_map:
+        return None
+    packages_to_delete = [slug for _, slug in results_map.values()]
+
+    # Perform Deletion if requested (--plan only records it)
+    deleted_slugs = set()
+    failed_slugs = set()
+    planned_slugs = set()
+    if delete and packages_to_delete:
+        if delete_plan is not None:
+            planned_slugs = delete_plan.add(workspace, repo, img, (rows[0] for rows, _ in results_map.values()))
+        else:
+            deleted_slugs, failed_slugs = batch_delete_packages(workspace, repo, packages_to_delete)
+
+    # Build Result Groups
+    return build_untagged_groups(max(results_map) + 1, results_map, delete, deleted_slugs, failed_slugs, planned_slugs)
+
+def image_listing_url(workspace, repo, img_name):
+    # Construct query: format:docker AND name:{img_name} (if provided)
+    query_parts = ["format:docker"]
+    if img_name:
+        query_parts.append(f"name:{img_name}")
+    
+    query = urlencode({'query': " AND ".join(query_parts), 'page_size': API_PAGE_SIZE})
+    return f"{packages_api_url(workspace, repo)}?{query}"
+
+def collect_page_tags(data, tags, index):
+    """Adds one listing page to the package index and the tag set; returns the tags new to it."""
+    index.add_all(data)
+    new_tags = []
+    for pkg in data:
+        # pkg['tags'] is a dict like {'version': [...]}
+        version_tags = pkg.get('tags', {}).get('version', [])
+        for t in version_tags:
+            if t not in tags:
+                tags.add(t)
+                new_tags.append(t)
+    return new_tags
+
+def analyze_tag(workspace, repo, img, ntag, detailed=False, index=None, state=None):
+    """Returns (rows, reused): rebuilt from --since-state when the tag hasn't moved, fetched otherwise."""
+    if state is not None:
+        rows = state.reuse_tag(workspace, repo, img, ntag, index, detailed)
+        if rows is not None:
+            return rows, True
+    return fetch_tag_data(workspace, repo, img, ntag, detailed, index, state), False
+
+def iter_tag_results(workspace, repo, img_name, detailed=False, progress=None, state=None):
+    """Yields (tag, rows) for each tag of an image as it resolves, in completion order.
+
+    With `state`, unchanged tags are rebuilt from it and, once every tag has
+    been yielded, tags no longer listed are pruned from it.
+    """
+    # Switch to Cloudsmith API to avoid upstream tags and allow filtering
+    next_url = image_listing_url(workspace, repo, img_name)
+    
+    tags = set()
+    # Index every package in the listing so tag and digest lookups skip the API
+    index = PackageIndex()
+    future_to_tag = {}
+    task_id = None
+    
+    # Pagination Loop: each page's new tags are queued straight away, so their
+    # manifests are fetched while the rest of the listing is still paging in
+    try:
+        while next_url:
+            result = make_request(next_url, {"Cache-Control": "no-cache"}, return_headers=True)
+            if not result:
+                break
+                
+            data, headers = result
+            for t in collect_page_tags(data, tags, index):
+                future_to_tag[scheduler.submit(PRIORITY_TAG, analyze_tag, workspace, repo, img_name, t, detailed, index, state)] = t
+
+            if progress and future_to_tag:
+                if task_id is None:
+                    task_id = progress.add_task(f"[cyan]Analyzing {img_name}[/cyan] (tags)", total=len(future_to_tag))
+                else:
+                    progress.update(task_id, total=len(future_to_tag))
+            
+            # Handle Pagination via Link header
+            next_url = next_page_url(headers)
+    finally:
+        index.mark_complete()
+
+    if not tags:
+        logger.info(f"No tags found for image: {img_name}")
+        return
+
+    logger.debug(f"Indexed {len(index)} packages for image: {img_name}")
+    if progress and task_id is not None:
+        progress.update(task_id, description=f"[cyan]Analyzing {img_name}[/cyan] ({len(tags)} tags)")
+
+    reused = 0
+    try:
+        for future in scheduler.as_completed(future_to_tag):
+            try:
+                rows, from_state = future.result()
+            except Exception:
+                logger.exception(f"Failed to analyze tag {future_to_tag[future]} of {img_name}")
+            else:
+                reused += from_state
+                yield future_to_tag[future], rows
+
+            if progress and task_id is not None:
+                progress.advance(task_id)
+    finally:
+        if progress and task_id is not None:
+            progress.remove_task(task_id)
+
+    if state is not None:
+        logger.info(f"Reused {reused} of {len(tags)} tags from state for image: {img_name}")
+        state.prune(workspace, repo, img_name, sorted(tags))
+
+@profiler.stage("get_image_analysis")
+def get_image_analysis(workspace, repo, img_name, delete_all=False, delete_tag=None, detailed=False, progress=None, state=None):
+    results = dict(iter_tag_results(workspace, repo, img_name, detailed, progress, state))
+    if not results:
+        return None
+
+    # Groups come out in tag order, however the tags were listed or finished
+    groups = [results[t] for t in sorted(results)]
+
+    # Deletion Logic for Tagged Images
+    packages_to_delete = tagged_delete_candidates(groups, delete_all, delete_tag)
+
+    if packages_to_delete:
+        logger.info(f"Identified {len(packages_to_delete)} tagged packages to delete for image: {img_name}")
+
+    deleted_slugs = set()
+    failed_slugs = set()
+    planned_slugs = set()
+    if packages_to_delete:
+        if delete_plan is not None:
+            planned_slugs = delete_plan.add(workspace, repo, img_name, planned_parents(groups, packages_to_delete))
+        else:
+            deleted_slugs, failed_slugs = batch_delete_packages(workspace, repo, packages_to_delete)
+
+    # Update Action Status in Groups
+    apply_tagged_actions(groups, deleted_slugs, failed_slugs, planned_slugs)
 
     return groups
 
+def catalog_url(org, repo):
+    return f"{CLOUDSMITH_URL}/v2/{org}/{repo}/_catalog?{urlencode({'n': CATALOG_PAGE_SIZE})}"
+
+def fetch_catalog_page(url):
+    """Returns {"repositories": [...], "next": url or None} for one catalog page, or None if it can't be read."""
+    entry, headers = _conditional_prepare(url, {"Accept": "application/json", "Cache-Control": "no-cache"})
+    result = make_request(url, headers, return_headers=True)
+    # The next-page link is cached with the page, since a 304 needn't repeat it
+    link = next_page_url(result[1]) if result and result[0] is not NOT_MODIFIED else None
+
+    def parse(catalog_json):
+        repositories = catalog_json.get('repositories')
+        if repositories is None:
+            return None
+        return {"repositories": repositories, "next": urljoin(url, link) if link else None}
+
+    return _conditional_finish(url, entry, result, parse)
+
+def iter_catalog(org, repo):
+    """Follows the catalog's `n`/`last` Link pagination, yielding each page's image names.
+
+    Yields nothing if not even the first page could be read.
+    """
+    logger.info(f"Fetching catalog for {org}/{repo}")
+    url = catalog_url(org, repo)
+    pages = 0
+    total = 0
+    while url:
+        page = fetch_catalog_page(url)
+        if page is None:
+            if pages:
+                logger.error(f"Catalog for {org}/{repo} is incomplete, stopped after {total} images: {url}")
+            break
+        pages += 1
+        total += len(page['repositories'])
+        yield page['repositories']
+        url = page['next']
+    if pages:
+        logger.info(f"Found {total} images in catalog for {org}/{repo} ({pages} pages).")
+
+def page_catalog(org, repo, on_page):
+    """Calls on_page(names) for each catalog page; returns False if not even the first page could be read."""
+    pages = 0
+    for names in iter_catalog(org, repo):
+        pages += 1
+        on_page(names)
+    return pages > 0
+
+def filter_images(names, include=None, exclude=None):
+    """Applies the --include / --exclude globs to catalog image names."""
+    return [
+        name for name in names
+        if (not include or any(fnmatch.fnmatchcase(name, g) for g in include))
+        and not any(fnmatch.fnmatchcase(name, g) for g in exclude or ())
+    ]
+
+def iter_scan_jobs(targets, args, failures):
+    """Yields batches of (org, repo, img, label) to scan as soon as each is known.
+
+    Explicitly named images come first. Repos without an image have their
+    catalogs paged on the scheduler, side by side, and every page is filtered
+    and yielded as it arrives, so images are queued while later pages are
+    still being fetched. (org, repo) pairs whose catalog fails go to failures.
+    """
+    seen = set()
+
+    def batch(org, repo, names):
+        jobs = []
+        for name in names:
+            if (org, repo, name) not in seen:
+                seen.add((org, repo, name))
+                # With --targets, results are labelled org/repo/img
+                jobs.append((org, repo, name, f"{org}/{repo}/{name}" if args.targets else name))
+        return jobs
+
+    explicit = []
+    for org, repo, img in targets:
+        if img:
+            explicit.extend(batch(org, repo, [img]))
+    if explicit:
+        yield explicit
+
+    catalog_targets = list(dict.fromkeys((org, repo) for org, repo, img in targets if not img))
+    pages = queue.Queue()
+
+    def enumerate_catalog(org, repo):
+        ok = False
+        try:
+            ok = page_catalog(org, repo, lambda names: pages.put((org, repo, names)))
+        finally:
+            pages.put((org, repo, ok))
+
+    for org, repo in catalog_targets:
+        scheduler.submit(PRIORITY_IMAGE, enumerate_catalog, org, repo)
+
+    remaining = len(catalog_targets)
+    while remaining:
+        org, repo, item = pages.get()
+        if item is True:
+            remaining -= 1
+        elif item is False:
+            remaining -= 1
+            failures.append((org, repo))
+            msg = "Failed to fetch catalog or no images found."
+            if args.targets:
+                msg = f"Failed to fetch catalog for {org}/{repo} or no images found."
+            (console if args.output == 'table' else PlainConsole()).print(f"[red]{msg}[/red]")
+            logger.error(msg)
+        else:
+            jobs = batch(org, repo, filter_images(item, args.include, args.exclude))
+            if jobs:
+                yield jobs
+
+def parse_targets(lines):
+    """Parses org/repo[/img] lines (blank lines and # comments skipped) into (org, repo, img) tuples."""
+    targets = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        # Image names can contain slashes themselves
+        parts = line.strip('/').split('/', 2)
+        if len(parts) < 2 or not all(parts):
+            raise ValueError(f"line {lineno}: expected org/repo[/img], got {line!r}")
+        targets.append((parts[0], parts[1], parts[2] if len(parts) == 3 else None))
+    return targets
+
+def read_targets(path):
+    if path == '-':
+        return parse_targets(sys.stdin)
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_targets(f)
+
 def process_image(org, repo, img_name, args, progress=None):
     if args.untagged or args.untagged_delete:
         return get_untagged_images(org, repo, img_name, delete=args.untagged_delete, detailed=args.detailed, progress=progress)
     else:
-        return get_image_analysis(org, repo, img_name, delete_all=args.delete_all, delete_tag=args.delete_tag, detailed=args.detailed, progress=progress)
+        return get_image_analysis(org, repo, img_name, delete_all=args.delete_all, delete_tag=args.delete_tag, detailed=args.detailed, progress=progress, state=scan_state)
+
+def scan_images_threaded(job_batches, args, on_result, progress=None, task=None):
+    """Scans every (org, repo, img, label) on the shared scheduler, calling on_result(label, groups) as each completes.
+
+    Jobs are queued batch by batch as job_batches produces them. Returns the
+    labels of the images that failed.
+    """
+    failed = []
+    try:
+        future_to_img = {}
+        for batch in job_batches:
+            for org, repo, img, label in batch:
+                future_to_img[scheduler.submit(PRIORITY_IMAGE, process_image, org, repo, img, args, progress=progress)] = label
+            if task is not None:
+                progress.update(task, total=len(future_to_img), description=f"Processing {len(future_to_img)} images...")
+        
+        for future in scheduler.as_completed(future_to_img):
+            img_name = future_to_img[future]
+            try:
+                groups = future.result()
+                if groups:
+                    on_result(img_name, groups)
+            except Exception as e:
+                logger.exception(f"Error processing {img_name}")
+                failed.append(img_name)
+                # Machine-readable modes get a PlainConsole here, so this goes to stderr
+                progress.console.print(f"[red]Error processing {img_name}: {e}[/red]")
+            
+            if task is not None:
+                progress.advance(task)
+        
+    except KeyboardInterrupt:
+        # Drop queued work; workers are daemon threads and die with the process
+        scheduler.shutdown(cancel_pending=True)
+        raise
+    return failed
+
+# --- Python API ---
+
+def configure(api_key=None, concurrency=None, cache_dir=None):
+    """Sets the process-wide settings every scan shares; arguments left as None are unchanged.
+
+    Without it, requests use CLOUDSMITH_API_KEY, DEFAULT_CONCURRENCY workers
+    and no on-disk cache.
+    """
+    global API_KEY, AUTH_HEADER, scheduler, manifest_cache, response_cache
+    if api_key is not None:
+        API_KEY = api_key
+        AUTH_HEADER = {"Authorization": f"Bearer {api_key}"}
+    if concurrency is not None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        # Let the old scheduler's idle workers exit
+        scheduler.shutdown()
+        scheduler = Scheduler(concurrency)
+        # Enough keep-alive connections that the pool doesn't become the cap
+        http_client.resize(max(HTTP_POOL_SIZE, concurrency))
+    if cache_dir is not None:
+        try:
+            manifest_cache = ManifestCache(cache_dir)
+            response_cache = ResponseCache(cache_dir)
+        except OSError as e:
+            logger.warning(f"Manifest cache disabled, can't use {cache_dir}: {e}")
+
+class Scanner:
+    """Scans one Cloudsmith Docker repository from Python instead of the CLI.
+
+        import multiarch
+        scanner = multiarch.Scanner("my-org", "my-repo")
+        for img in scanner.iter_images():
+            for group in scanner.iter_tags(img, detailed=True):
+                print(group[0].tag, group[0].downloads)
+
+    Every method is a generator yielding results as they resolve. Tag and
+    untagged results are RowGroups: the manifest list's Row (whose `slug` is
+    what delete() takes), then with `detailed` one Row per platform image.
+    Importing the module has no side effects, and all scanners in a process
+    share one connection pool, rate limiter, scheduler and set of caches, so
+    reusing them across queries keeps connections and caches warm. Each
+    iter_* call starts without memoized lookups, so status and downloads are
+    read fresh. See configure() for the API key, concurrency and on-disk cache.
+    """
+
+    def __init__(self, org, repo):
+        self.org = org
+        self.repo = repo
+
+    def iter_images(self, include=None, exclude=None):
+        """Yields image names from the registry catalog, a page at a time, filtered by include/exclude globs."""
+        request_coalescer.clear()
+        for names in iter_catalog(self.org, self.repo):
+            yield from filter_images(names, include, exclude)
+
+    def iter_tags(self, img, detailed=False):
+        """Yields a RowGroup per tag of `img`, in completion order."""
+        request_coalescer.clear()
+        for _, rows in iter_tag_results(self.org, self.repo, img, detailed):
+            yield rows
+
+    def iter_untagged(self, img, detailed=False):
+        """Yields a RowGroup per manifest list of `img` that has no tags, in completion order."""
+        request_coalescer.clear()
+        for _, rows, _ in iter_untagged_results(self.org, self.repo, img, detailed):
+            yield rows
+
+    def delete(self, slugs):
+        """Deletes packages by slug, yielding (slug, success) as each completes.
+
+        Nothing is deleted until the generator is iterated, and closing it
+        early cancels the deletes that haven't started. A package that is
+        already gone counts as deleted.
+        """
+        yield from iter_deletes(self.org, self.repo, list(slugs))
+
+# --- Async Engine ---
+
+class AsyncEngine:
+    """Runs the scan pipeline as coroutines under one global concurrency limit.
+
+    Requests still go through make_request (and so the shared connection pool);
+    each one runs on a worker thread while holding a slot of the semaphore, so
+    at most `concurrency` requests are in flight across all images and tags.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+
+    async def request(self, url, headers=None, **kwargs):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(make_request, url, headers, **kwargs))
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+@profiler.stage("batch_delete_packages")
+async def batch_delete_packages_async(engine, workspace, repo, slugs):
+    """Coroutine version of batch_delete_packages."""
+    deleted = set()
+    failed = set()
+    if not slugs:
+        return deleted, failed
+
+    logger.info(f"Starting batch deletion for {len(slugs)} packages.")
+
+    # All at once: the engine's --concurrency limit and the shared rate
+    # limiter decide how fast they actually go out
+    async def delete_pkg(slug):
+        return slug, await engine.request(f"{packages_api_url(workspace, repo)}{slug}/", method='DELETE')
+
+    for outcome in asyncio.as_completed([delete_pkg(slug) for slug in slugs]):
+        slug, success = await outcome
+        if success:
+            deleted.add(slug)
+            logger.info(f"Deleted package slug: {slug}")
+        else:
+            failed.add(slug)
+            logger.error(f"Failed to delete package slug: {slug}")
+
+    return deleted, failed
+
+async def fetch_manifest_by_digest_async(engine, workspace, repo, img, digest, accept):
+    """Coroutine version of fetch_manifest_by_digest."""
+    if manifest_cache is not None:
+        cached = manifest_cache.get(digest)
+        if cached is not None:
+            return cached
+
+    manifest_json = await engine.request(manifest_url(workspace, repo, img, digest), {"Accept": accept, "Cache-Control": "no-cache"})
+    if manifest_json and manifest_cache is not None:
+        manifest_cache.put(digest, manifest_json)
+    return manifest_json
+
+@profiler.stage("get_digest_data")
+async def get_digest_data_async(engine, workspace, repo, img, digest, ntag_display, platform="unknown", index=None):
+    """Coroutine version of get_digest_data."""
+    if platform == "unknown":
+        manifest_json = await fetch_manifest_by_digest_async(engine, workspace, repo, img, digest, "application/vnd.oci.image.manifest.v2+json")
+        platform = resolve_platform(manifest_json, digest)
+
+    entry = await index.get_version_async(digest) if index is not None else None
+    pkg_details = None
+    if entry is None:
+        version = digest.replace("sha256:", "")
+        api_url = f"{packages_api_url(workspace, repo)}?query=version:{version}"
+        pkg_details = await engine.request(api_url, {"Cache-Control": "no-cache"})
+
+    return build_digest_row(digest, ntag_display, platform, entry, pkg_details)
+
+@profiler.stage("fetch_tag_data")
+async def fetch_tag_data_async(engine, workspace, repo, img, ntag, detailed=False, index=None, state=None):
+    """Coroutine version of fetch_tag_data; child digests are resolved concurrently."""
+    parent_pkg = await index.get_tag_async(ntag) if index is not None else None
+
+    children = None
+    if parent_pkg is not None and parent_pkg.get('version'):
+        manifest_json = await fetch_manifest_by_digest_async(engine, workspace, repo, img, normalize_digest(parent_pkg['version']), TAG_MANIFEST_ACCEPT)
+        children = parse_index_children(manifest_json) if manifest_json else None
+
+    if children is None:
+        manifest_json = await engine.request(manifest_url(workspace, repo, img, ntag), {"Accept": TAG_MANIFEST_ACCEPT, "Cache-Control": "no-cache"})
+        children = parse_index_children(manifest_json) if manifest_json else None
+    if children is None:
+        return []
+
+    children_data = await asyncio.gather(*(
+        get_digest_data_async(engine, workspace, repo, img, child['digest'], ntag, platform=child['platform'], index=index)
+        for child in children
+    ))
+
+    if parent_pkg is None:
+        api_url = f"{packages_api_url(workspace, repo)}?query=version:{ntag}"
+        pkg_details = await engine.request(api_url, {"Cache-Control": "no-cache"})
+        if pkg_details and len(pkg_details) > 0:
+            parent_pkg = pkg_details[0]
+
+    children_data = list(children_data)
+    if state is not None:
+        state.record_tag(workspace, repo, img, ntag, parent_pkg, children_data)
+
+    return build_tag_rows(ntag, parent_pkg, children_data, detailed)
+
+@profiler.stage("fetch_untagged_data")
+async def fetch_untagged_data_async(engine, pkg, workspace, repo, img, detailed=False, index=None):
+    """Coroutine version of fetch_untagged_data."""
+    digest = untagged_digest(pkg)
+    slug = pkg.get('slug')
+
+    manifest_json = await fetch_manifest_by_digest_async(engine, workspace, repo, img, digest, "application/vnd.oci.image.manifest.v1+json")
+    platform_str, child_digests = parse_untagged_manifest(manifest_json)
+
+    results = RowGroup([build_untagged_parent_row(pkg, digest, platform_str)], section_break=detailed)
+
+    if detailed:
+        rows = await asyncio.gather(*(
+            get_digest_data_async(engine, workspace, repo, img, child['digest'], "(untagged)", platform=child['platform'], index=index)
+            for child in child_digests
+        ))
+        results.extend(rows)
+
+    return results, slug
+
+async def _gather_tracked(coros, progress=None, task_id=None):
+    """Awaits coroutines (or tasks) concurrently, advancing progress as each finishes.
+
+    Returns results in submission order; failed items come back as None.
+    """
+    async def tracked(coro):
+        try:
+            return await coro
+        except Exception:
+            logger.exception("Task failed")
+            return None
+        finally:
+            if progress and task_id is not None:
+                progress.advance(task_id)
+
+    return await asyncio.gather(*(tracked(c) for c in coros))
+
+@profiler.stage("get_untagged_images")
+async def get_untagged_images_async(engine, workspace, repo, img, delete=False, detailed=False, progress=None):
+    """Coroutine version of get_untagged_images."""
+    next_url = untagged_listing_url(workspace, repo, img)
+    index = PackageIndex()
+    pending = []
+    task_id = None
+
+    try:
+        while next_url:
+            result = await engine.request(next_url, {"Cache-Control": "no-cache"}, return_headers=True)
+            if not result:
+                break
+
+            data, headers = result
+            index.add_all(data)
+            for pkg in select_untagged(data):
+                pending.append(asyncio.ensure_future(fetch_untagged_data_async(engine, pkg, workspace, repo, img, detailed, index)))
+
+            if progress and pending:
+                if task_id is None:
+                    task_id = progress.add_task(f"[cyan]Analyzing {img}[/cyan] (untagged)", total=len(pending))
+                else:
+                    progress.update(task_id, total=len(pending))
+
+            next_url = next_page_url(headers)
+    finally:
+        index.mark_complete()
+
+    if not pending:
+        return None
+
+    logger.info(f"Found {len(pending)} untagged manifest lists for image: {img}")
+    if progress and task_id is not None:
+        progress.update(task_id, description=f"[cyan]Analyzing {img}[/cyan] ({len(pending)} untagged)")
+
+    outcomes = await _gather_tracked(pending, progress, task_id)
+
+    if progress and task_id is not None:
+        progress.remove_task(task_id)
+
+    results_map = {i: outcome for i, outcome in enumerate(outcomes) if outcome is not None}
+    packages_to_delete = [slug for _, slug in results_map.values()]
+
+    deleted_slugs = set()
+    failed_slugs = set()
+    planned_slugs = set()
+    if delete and packages_to_delete:
+        if delete_plan is not None:
+            planned_slugs = delete_plan.add(workspace, repo, img, (rows[0] for rows, _ in results_map.values()))
+        else:
+            deleted_slugs, failed_slugs = await batch_delete_packages_async(engine, workspace, repo, packages_to_delete)
+
+    return build_untagged_groups(len(pending), results_map, delete, deleted_slugs, failed_slugs, planned_slugs)
+
+async def analyze_tag_async(engine, workspace, repo, img, ntag, detailed=False, index=None, state=None):
+    """Coroutine version of analyze_tag."""
+    if state is not None:
+        # State lookups block on index misses, so only try once the listing is in
+        await index.wait_complete_async()
+        rows = state.reuse_tag(workspace, repo, img, ntag, index, detailed)
+        if rows is not None:
+            return rows, True
+    return await fetch_tag_data_async(engine, workspace, repo, img, ntag, detailed, index, state), False
+
+@profiler.stage("get_image_analysis")
+async def get_image_analysis_async(engine, workspace, repo, img_name, delete_all=False, delete_tag=None, detailed=False, progress=None, state=None):
+    """Coroutine version of get_image_analysis."""
+    next_url = image_listing_url(workspace, repo, img_name)
+
+    tags = set()
+    index = PackageIndex()
+    pending = {}
+    task_id = None
+
+    try:
+        while next_url:
+            result = await engine.request(next_url, {"Cache-Control": "no-cache"}, return_headers=True)
+            if not result:
+                break
+
+            data, headers = result
+            for t in collect_page_tags(data, tags, index):
+                pending[t] = asyncio.ensure_future(analyze_tag_async(engine, workspace, repo, img_name, t, detailed, index, state))
+
+            if progress and pending:
+                if task_id is None:
+                    task_id = progress.add_task(f"[cyan]Analyzing {img_name}[/cyan] (tags)", total=len(pending))
+                else:
+                    progress.update(task_id, total=len(pending))
+
+            next_url = next_page_url(headers)
+    finally:
+        index.mark_complete()
+
+    if not tags:
+        logger.info(f"No tags found for image: {img_name}")
+        return None
+
+    logger.debug(f"Indexed {len(index)} packages for image: {img_name}")
+    if progress and task_id is not None:
+        progress.update(task_id, description=f"[cyan]Analyzing {img_name}[/cyan] ({len(tags)} tags)")
+
+    outcomes = await _gather_tracked(list(pending.values()), progress, task_id)
+    results = {t: outcome[0] for t, outcome in zip(pending, outcomes) if outcome is not None}
+    if state is not None:
+        reused = sum(1 for outcome in outcomes if outcome is not None and outcome[1])
+        logger.info(f"Reused {reused} of {len(tags)} tags from state for image: {img_name}")
+
+    sorted_tags = sorted(tags)
+    groups = [results[t] for t in sorted_tags if t in results]
+
+    if progress and task_id is not None:
+        progress.remove_task(task_id)
+
+    if state is not None:
+        state.prune(workspace, repo, img_name, sorted_tags)
+
+    packages_to_delete = tagged_delete_candidates(groups, delete_all, delete_tag)
+
+    if packages_to_delete:
+        logger.info(f"Identified {len(packages_to_delete)} tagged packages to delete for image: {img_name}")
+
+    deleted_slugs = set()
+    failed_slugs = set()
+    planned_slugs = set()
+    if packages_to_delete:
+        if delete_plan is not None:
+            planned_slugs = delete_plan.add(workspace, repo, img_name, planned_parents(groups, packages_to_delete))
+        else:
+            deleted_slugs, failed_slugs = await batch_delete_packages_async(engine, workspace, repo, packages_to_delete)
+
+    apply_tagged_actions(groups, deleted_slugs, failed_slugs, planned_slugs)
+
+    return groups
+
+async def process_image_async(engine, org, repo, img_name, args, progress=None):
+    if args.untagged or args.untagged_delete:
+        return await get_untagged_images_async(engine, org, repo, img_name, delete=args.untagged_delete, detailed=args.detailed, progress=progress)
+    else:
+        return await get_image_analysis_async(engine, org, repo, img_name, delete_all=args.delete_all, delete_tag=args.delete_tag, detailed=args.detailed, progress=progress, state=scan_state)
+
+async def scan_images_async(job_batches, args, on_result, progress=None, task=None):
+    """Scans every (org, repo, img, label) with the async engine, calling on_result(label, groups) as each completes.
+
+    Returns the labels of the images that failed.
+    """
+    engine = AsyncEngine(args.concurrency)
+    failed = []
+
+    async def run(org, repo, img, img_name):
+        try:
+            groups = await process_image_async(engine, org, repo, img, args, progress=progress)
+            if groups:
+                on_result(img_name, groups)
+        except Exception as e:
+            logger.exception(f"Error processing {img_name}")
+            failed.append(img_name)
+            progress.console.print(f"[red]Error processing {img_name}: {e}[/red]")
+        finally:
+            if task is not None:
+                progress.advance(task)
+
+    try:
+        # job_batches blocks on catalog pages, so it's drained off the event loop
+        loop = asyncio.get_running_loop()
+        batches = iter(job_batches)
+        pending = []
+        while True:
+            batch = await loop.run_in_executor(None, next, batches, None)
+            if batch is None:
+                break
+            pending.extend(asyncio.ensure_future(run(*job)) for job in batch)
+            if task is not None:
+                progress.update(task, total=len(pending), description=f"Processing {len(pending)} images...")
+        await asyncio.gather(*pending)
+    except BaseException:
+        engine.close(wait=False)
+        raise
+    engine.close()
+    return failed
+
+# --- Summary ---
+
+# Images listed in the --summary top-N table unless --top says otherwise
+SUMMARY_TOP_N = 10
+
+class Summary:
+    """Streaming roll-up of scan results for --summary.
+
+    Each image's groups are folded into running totals as the image completes
+    and then dropped, so memory grows with the number of platforms (and of
+    quarantined tags), not with the number of rows. Downloads are counted once
+    per child digest within an image, so tag aliases don't double count. A tag
+    on a single-platform image has no children; its own row is counted instead.
+    """
+
+    def __init__(self, top_n=SUMMARY_TOP_N):
+        self.top_n = top_n
+        self.images = 0
+        self.tags = 0
+        self.platform_downloads = {}
+        self.platform_digests = {}
+        self.quarantined = []
+        self._top = []  # min-heap of (downloads, image) holding the current top N
+
+    def add_image(self, img_name, groups):
+        self.images += 1
+        seen = set()
+        image_downloads = 0
+        for group in groups:
+            if not group:
+                continue
+            parent = group[0]
+            self.tags += 1
+            if any("Quarantined" in (row.status or "") for row in group):
+                self.quarantined.append({"image": img_name, "tag": parent.tag, "digest": parent.digest})
+
+            for row in (group[:1] if parent.type == "image" else group[1:]):
+                if row.digest in seen:
+                    continue
+                seen.add(row.digest)
+                downloads = row.downloads or 0
+                image_downloads += downloads
+                self.platform_downloads[row.platform] = self.platform_downloads.get(row.platform, 0) + downloads
+                self.platform_digests[row.platform] = self.platform_digests.get(row.platform, 0) + 1
+
+        entry = (image_downloads, img_name)
+        if len(self._top) < self.top_n:
+            heapq.heappush(self._top, entry)
+        elif self.top_n and entry > self._top[0]:
+            heapq.heapreplace(self._top, entry)
+
+    def report(self):
+        platforms = sorted(self.platform_downloads.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "images": self.images,
+            "tags": self.tags,
+            "downloads_by_platform": [
+                {"platform": platform, "digests": self.platform_digests[platform], "downloads": downloads}
+                for platform, downloads in platforms
+            ],
+            "platforms_never_pulled": sorted(p for p, downloads in platforms if downloads == 0),
+            "quarantined_tags": sorted(self.quarantined, key=lambda q: (q["image"], q["tag"] or "")),
+            "top_images": [
+                {"image": img_name, "downloads": downloads}
+                for downloads, img_name in sorted(self._top, key=lambda item: (-item[0], item[1]))
+            ],
+        }
+
+def print_summary(summary, output):
+    """Prints the --summary report as tables, or as JSON for machine-readable output."""
+    report = summary.report()
+    if output != 'table':
+        indent = 2 if output == 'json' else None
+        sys.stdout.write(json.dumps(report, indent=indent) + "\n")
+        return
+
+    console.print(f"[bold]Summary:[/bold] {report['images']} images, {report['tags']} tags")
+
+    platforms_table = Table(title="Downloads by Platform", box=box.ROUNDED)
+    platforms_table.add_column("Platform", style="cyan")
+    platforms_table.add_column("Digests", justify="right")
+    platforms_table.add_column("Downloads", justify="right")
+    for entry in report["downloads_by_platform"]:
+        downloads = f"[green]{entry['downloads']}[/green]" if entry['downloads'] else "[yellow]0 (never pulled)[/yellow]"
+        platforms_table.add_row(entry["platform"], str(entry["digests"]), downloads)
+    print_table(platforms_table)
+
+    top_table = Table(title=f"Top {summary.top_n} Images by Downloads", box=box.ROUNDED)
+    top_table.add_column("Image", style="cyan")
+    top_table.add_column("Downloads", justify="right")
+    for entry in report["top_images"]:
+        top_table.add_row(entry["image"], f"[green]{entry['downloads']}[/green]")
+    print_table(top_table)
+
+    if report["quarantined_tags"]:
+        quarantined_table = Table(title="Tags with Quarantined Images", box=box.ROUNDED)
+        quarantined_table.add_column("Image", style="cyan")
+        quarantined_table.add_column("Tag")
+        quarantined_table.add_column("Digest", style="dim")
+        for entry in report["quarantined_tags"]:
+            quarantined_table.add_row(entry["image"], entry["tag"], entry["digest"])
+        print_table(quarantined_table)
+    else:
+        console.print("[green]No tags with quarantined images.[/green]\n")
+
+# --- Watch Mode ---
+
+# Port of the --watch metrics endpoint unless --metrics-port says otherwise
+DEFAULT_METRICS_PORT = 9464
+
+def prometheus_labels(**labels):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+class MetricsStore:
+    """Latest rows per image across --watch cycles, rendered for the metrics endpoint."""
+
+    def __init__(self):
+        self._images = {}
+        self._lock = threading.Lock()
+        self.cycles = 0
+        self.last_cycle_end = None
+        self.last_cycle_seconds = None
+
+    def update(self, image, groups):
+        rows = [row for group in groups for row in group]
+        with self._lock:
+            self._images[image] = rows
+
+    def finish_cycle(self, seen, seconds, prune=True):
+        """Records a finished cycle; images it didn't return are dropped unless prune is False."""
+        with self._lock:
+            if prune:
+                self._images = {image: rows for image, rows in self._images.items() if image in seen}
+            self.cycles += 1
+            self.last_cycle_end = time.time()
+            self.last_cycle_seconds = seconds
+
+    def to_json(self):
+        with self._lock:
+            return {
+                "cycles": self.cycles,
+                "last_cycle_end": self.last_cycle_end,
+                "last_cycle_seconds": self.last_cycle_seconds,
+                "images": {image: [row.to_dict() for row in rows] for image, rows in sorted(self._images.items())},
+            }
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP cloudsmith_docker_downloads Downloads per image, tag and platform digest (manifest lists sum their platforms).",
+            "# TYPE cloudsmith_docker_downloads gauge",
+        ]
+        status_lines = [
+            "# HELP cloudsmith_docker_status Sync status of each digest; always 1, the status is a label.",
+            "# TYPE cloudsmith_docker_status gauge",
+        ]
+        with self._lock:
+            for image, rows in sorted(self._images.items()):
+                for row in rows:
+                    labels = {"image": image, "tag": row.tag, "type": row.type, "platform": row.platform, "digest": row.digest}
+                    lines.append(f"cloudsmith_docker_downloads{prometheus_labels(**labels)} {row.downloads or 0}")
+                    status_lines.append(f"cloudsmith_docker_status{prometheus_labels(**labels, status=row.status)} 1")
+            lines += status_lines
+            lines += [
+                "# HELP cloudsmith_docker_sleuth_cycles_total Completed --watch scan cycles.",
+                "# TYPE cloudsmith_docker_sleuth_cycles_total counter",
+                f"cloudsmith_docker_sleuth_cycles_total {self.cycles}",
+                "# HELP cloudsmith_docker_sleuth_images Images in the latest results.",
+                "# TYPE cloudsmith_docker_sleuth_images gauge",
+                f"cloudsmith_docker_sleuth_images {len(self._images)}",
+            ]
+            if self.last_cycle_end is not None:
+                lines += [
+                    "# HELP cloudsmith_docker_sleuth_last_cycle_timestamp_seconds When the latest cycle finished.",
+                    "# TYPE cloudsmith_docker_sleuth_last_cycle_timestamp_seconds gauge",
+                    f"cloudsmith_docker_sleuth_last_cycle_timestamp_seconds {self.last_cycle_end:.3f}",
+                    "# HELP cloudsmith_docker_sleuth_last_cycle_duration_seconds How long the latest cycle took.",
+                    "# TYPE cloudsmith_docker_sleuth_last_cycle_duration_seconds gauge",
+                    f"cloudsmith_docker_sleuth_last_cycle_duration_seconds {self.last_cycle_seconds:.3f}",
+                ]
+        return "\n".join(lines) + "\n"
+
+def serve_metrics(store, port, host="127.0.0.1"):
+    """Serves /metrics (Prometheus text) and /json from a background thread; returns the server."""
+    # Only --watch needs an HTTP server, so it isn't imported up front
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/metrics":
+                body, content_type = store.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/json":
+                body, content_type = json.dumps(store.to_json()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- Output Writers ---
+
+class JSONWriter:
+    """Streams {image: groups} as one JSON document, an image at a time.
+
+    The output is formatted exactly like json.dumps(results, indent=2).
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write_image(self, img_name, groups):
+        self.stream.write("{\n" if self.count == 0 else ",\n")
+        body = json.dumps(groups, indent=2, default=Row.to_dict).replace("\n", "\n  ")
+        self.stream.write(f"  {json.dumps(img_name)}: {body}")
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        # An empty run has always printed "[]"
+        self.stream.write("\n}\n" if self.count else "[]\n")
+        self.stream.flush()
+
+class NDJSONWriter:
+    """Streams one JSON object per row, tagged with its image name."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write_image(self, img_name, groups):
+        for group in groups:
+            for row in group:
+                self.stream.write(json.dumps({"image": img_name, **row.to_dict()}) + "\n")
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+
+class CSVWriter:
+    """Streams one flat CSV row per parent/child row."""
+
+    HEADER = ("Image", "Tag", "Type", "Platform", "Status", "Downloads", "Digest", "Action")
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self.writer = csv.writer(stream, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        self.writer.writerow(self.HEADER)
+
+    def write_image(self, img_name, groups):
+        for group in groups:
+            for row in group:
+                self.writer.writerow([
+                    img_name,
+                    row.tag,
+                    row.type,
+                    row.platform,
+                    row.status,
+                    row.downloads,
+                    row.digest,
+                    row.action or ""
+                ])
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+
+OUTPUT_WRITERS = {
+    'json': JSONWriter,
+    'ndjson': NDJSONWriter,
+    'csv': CSVWriter,
+}
+
+# Widest a table column is sized to; longer cells wrap inside it
+TABLE_MAX_COLUMN_WIDTH = 72
+# Narrowest the digest column is cut to on a small terminal ("sha256:" and 12 hex digits)
+TABLE_MIN_DIGEST_WIDTH = 19
+TABLE_HEADERS = ("Tag", "Type", "Platform", "Status", "Downloads", "Digest", "Action")
+TABLE_DIGEST_COLUMN = TABLE_HEADERS.index("Digest")
+
+@functools.cache
+def status_width(status):
+    """Terminal cells taken by a formatted status (the icons are double-width); measured once per status value."""
+    return Text.from_markup(format_status(status)).cell_len if status else 0
+
+def table_cells(groups, max_rows=None):
+    """Flattens groups into (row, is_parent, section_break) for the table.
+
+    With `max_rows`, stops after that many rows and also returns how many rows
+    and groups were left out.
+    """
+    cells = []
+    for index, group in enumerate(groups):
+        for position, row in enumerate(group):
+            if max_rows is not None and len(cells) == max_rows:
+                rest = [g for g in groups[index + 1:] if g]
+                hidden_groups = len(rest) + (1 if position == 0 else 0)
+                return cells, len(group) - position + sum(len(g) for g in rest), hidden_groups
+            last = position == len(group) - 1
+            cells.append((row, position == 0, last and getattr(group, 'section_break', False)))
+    return cells, 0, 0
+
+def table_column_widths(cells, has_action):
+    """Column widths from the raw fields of the rows shown, capped at TABLE_MAX_COLUMN_WIDTH.
+
+    One len() per field, where rich would measure every rendered cell.
+    """
+    widths = [len(header) for header in TABLE_HEADERS[:7 if has_action else 6]]
+    for row, is_parent, _ in cells:
+        fields = (
+            len(row.tag or "") + (0 if is_parent else 5),
+            len(row.type or ""),
+            len(row.platform or ""),
+            status_width(row.status),
+            len(str(row.downloads)),
+            len(row.digest or ""),
+            len(row.action or ""),
+        )
+        widths = [max(width, field) for width, field in zip(widths, fields)]
+    return [min(width, TABLE_MAX_COLUMN_WIDTH) for width in widths]
+
+def fit_column_widths(widths, available):
+    """Narrows column widths until the table fits in `available` terminal cells.
+
+    The digest column goes first, down to TABLE_MIN_DIGEST_WIDTH (its cells are
+    cut short with an ellipsis), then whichever column has the most room above
+    its floor: the header's width, or that minimum for the digest. Each column
+    costs 3 cells of borders and padding.
+    """
+    widths = list(widths)
+    excess = sum(widths) + 3 * len(widths) + 1 - available
+    cut = min(max(excess, 0), max(widths[TABLE_DIGEST_COLUMN] - TABLE_MIN_DIGEST_WIDTH, 0))
+    widths[TABLE_DIGEST_COLUMN] -= cut
+    excess -= cut
+    floors = [TABLE_MIN_DIGEST_WIDTH if i == TABLE_DIGEST_COLUMN else len(header) for i, header in enumerate(TABLE_HEADERS)]
+    while excess > 0:
+        slack, column = max((width - floor, i) for i, (width, floor) in enumerate(zip(widths, floors)))
+        if slack <= 0:
+            break
+        widths[column] -= 1
+        excess -= 1
+    return widths
+
+@profiler.stage("render_table")
+def render_table(image_name, groups, is_untagged=False, has_action=False, max_rows=None):
+    require_rich()
+    cells, hidden_rows, hidden_groups = table_cells(groups, max_rows)
+    # Fixed widths spare rich a measuring pass over every cell
+    widths = fit_column_widths(table_column_widths(cells, has_action), console.width)
 
-def render_table(image_name, groups, is_untagged=False, has_action=False):
     # --- Table Setup ---
     table = Table(title=f"{'Untagged' if is_untagged else 'Tagged'} Image Analysis: {image_name}", box=box.ROUNDED)
-    table.add_column("Tag", style="cyan")
-    table.add_column("Type", style="magenta")
-    table.add_column("Platform")
-    table.add_column("Status")
-    table.add_column("Downloads", justify="right")
-    table.add_column("Digest", style="dim")
-    if has_action:
-        table.add_column("Action", style="bold red")
+    for header, width, options in zip(TABLE_HEADERS, widths, (
+        {"style": "cyan"}, {"style": "magenta"}, {}, {}, {"justify": "right"},
+        {"style": "dim", "overflow": "ellipsis", "no_wrap": True}, {"style": "bold red"},
+    )):
+        table.add_column(header, width=width, **options)
 
     # --- Row Rendering ---
-    for group in groups:
-        if not group: continue
-        parent = group[0]
-        
-        # Action string for delete status
-        action_str = parent.get('action', "")
-        
+    for row, is_parent, section_break in cells:
         # Parent Row
-        if is_untagged:
-            table.add_row(
-                parent.get("tag", ""),
-                parent.get("type", ""),
-                parent.get("platform", ""),
-                format_status(parent.get("status", "")),
-                f"[green]{parent.get('downloads', 0)}[/green]",
-                f"[dim]{parent.get('digest', '')}[/dim]",
-                action_str if has_action else None
-            )
+        if is_parent and is_untagged:
+            row_data = [
+                row.tag,
+                row.type,
+                row.platform,
+                format_status(row.status),
+                f"[green]{row.downloads}[/green]",
+                f"[dim]{row.digest}[/dim]",
+            ]
+        elif is_parent:
+            row_data = [
+                f"[bold cyan]{row.tag}[/bold cyan]",
+                f"[magenta]{row.type}[/magenta]",
+                row.platform,
+                format_status(row.status),
+                f"[green]{row.downloads}[/green]",
+                f"[dim]{row.digest}[/dim]"
+            ]
+        # Child Rows
         else:
             row_data = [
-                f"[bold cyan]{parent.get('tag', '')}[/bold cyan]",
-                "[magenta]manifest/list[/magenta]",
-                "multi",
-                format_status(parent.get("status", "")),
-                f"[green]{parent.get('downloads', 0)}[/green]",
-                f"[dim]{parent.get('digest', '')}[/dim]"
+                f"  └─ {row.tag}",
+                row.type,
+                row.platform,
+                format_status(row.status),
+                f"[green]{row.downloads}[/green]",
+                f"[dim]{row.digest}[/dim]"
             ]
-            if has_action:
-                row_data.append(action_str)
-            
-            table.add_row(*row_data)
+        if has_action:
+            # Action string for delete status
+            row_data.append(row.action or "")
+
+        table.add_row(*row_data)
+
+        if section_break:
+            table.add_section()
+
+    if hidden_rows:
+        # --max-rows: the rest of the image collapses into the caption
+        kind = "manifest list" if is_untagged else "tag"
+        table.caption = (f"… {hidden_rows} more row{'s' * (hidden_rows != 1)} ({hidden_groups} more {kind}{'s' * (hidden_groups != 1)}) "
+                         "not shown; use --output json or csv for all of them")
 
-        # Child Rows
-        if len(group) > 1:
-            for row in group[1:]:
-                if row == "SECTION":
-                    table.add_section()
-                else:
-                    row_data = [
-                        f"  └─ {row.get('tag', '')}",
-                        row.get("type", ""),
-                        row.get("platform", ""),
-                        format_status(row.get("status", "")),
-                        f"[green]{row.get('downloads', 0)}[/green]",
-                        f"[dim]{row.get('digest', '')}[/dim]"
-                    ]
-                    if has_action:
-                        row_data.append(row.get('action', ''))
-                    
-                    table.add_row(*row_data)
-    
     return table
 
+@profiler.stage("print_table")
+def print_table(table):
+    console.print(table)
+    console.print("")
+
+def print_profile(destination):
+    """Prints the --profile summary to stderr, or writes it as JSON to `destination`."""
+    report = profiler.report()
+    if destination != '-':
+        try:
+            with open(destination, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            logger.error(f"Failed to write profile to {destination}: {e}")
+        return
+
+    require_rich()
+    err_console = Console(stderr=True)
+
+    requests_table = Table(title="Requests", box=box.ROUNDED)
+    requests_table.add_column("Endpoint", style="cyan")
+    for column in ("Calls", "p50 ms", "p95 ms", "p99 ms", "Bytes", "Retries", "Rate-limit wait s"):
+        requests_table.add_column(column, justify="right")
+    for endpoint, stats in report["endpoints"].items():
+        requests_table.add_row(endpoint, str(stats["calls"]), f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}",
+                               f"{stats['p99_ms']:.1f}", str(stats["bytes"]), str(stats["retries"]), f"{stats['rate_limit_wait_s']:.2f}")
+
+    stages_table = Table(title="Stages", box=box.ROUNDED)
+    stages_table.add_column("Stage", style="magenta")
+    for column in ("Calls", "Total s", "p50 ms", "p95 ms", "p99 ms"):
+        stages_table.add_column(column, justify="right")
+    for name, stats in report["stages"].items():
+        stages_table.add_row(name, str(stats["calls"]), f"{stats['total_s']:.2f}", f"{stats['p50_ms']:.1f}",
+                             f"{stats['p95_ms']:.1f}", f"{stats['p99_ms']:.1f}")
+
+    err_console.print(requests_table)
+    err_console.print(stages_table)
+    err_console.print(f"Wall time {report['wall_s']:.2f}s, {report['requests']} requests, {report['bytes']} bytes, "
+                      f"{report['retries']} retries, {report['rate_limit_wait_s']:.2f}s waiting on rate limits "
+                      f"(stage and wait times are summed across concurrent workers)")
+
+class DummyProgress:
+    """Stands in for the rich progress bar when there's nothing to draw it on."""
+    def __enter__(self): return self
+    def __exit__(self, *args): pass
+    def add_task(self, *args, **kwargs): return None
+    def advance(self, *args, **kwargs): pass
+    def update(self, *args, **kwargs): pass
+    def remove_task(self, *args, **kwargs): pass
+    @property
+    def console(self): return console if console is not None else PlainConsole()
+
+def run_watch(targets, args):
+    """--watch: rescans every args.watch seconds, serving the latest results as metrics.
+
+    The connection pool, rate limiter, caches and scan state stay warm across
+    cycles, so unchanged tags cost only their listing page.
+    """
+    global scan_state
+    if scan_state is None:
+        scan_state = ScanState()
+    out = console if args.output == 'table' else PlainConsole()
+
+    store = MetricsStore()
+    try:
+        server = serve_metrics(store, args.metrics_port)
+    except OSError as e:
+        out.print(f"[red]Can't serve metrics on 127.0.0.1:{args.metrics_port}: {e}[/red]")
+        sys.exit(1)
+    out.print(f"[bold]Watching every {args.watch:g}s[/bold]; metrics on http://127.0.0.1:{server.server_address[1]}/metrics and /json")
+
+    try:
+        while True:
+            start = time.perf_counter()
+            # Memoized GETs would hide changes from this cycle
+            request_coalescer.clear()
+            seen = set()
+            failures = []
+
+            def on_result(image, groups, seen=seen):
+                store.update(image, groups)
+                seen.add(image)
+
+            job_batches = iter_scan_jobs(targets, args, failures)
+            if args.engine == 'async':
+                asyncio.run(scan_images_async(job_batches, args, on_result, progress=DummyProgress()))
+            else:
+                scan_images_threaded(job_batches, args, on_result, progress=DummyProgress())
+
+            elapsed = time.perf_counter() - start
+            # A failed catalog says nothing about its images, so keep their last results
+            store.finish_cycle(seen, elapsed, prune=not failures)
+            try:
+                scan_state.save()
+            except OSError as e:
+                logger.error(f"Failed to save scan state to {scan_state.path}: {e}")
+            logger.info(f"Watch cycle {store.cycles}: {len(seen)} images in {elapsed:.2f}s ({scan_state.reused} tags reused so far)")
+            out.print(f"Cycle {store.cycles}: {len(seen)} images in {elapsed:.1f}s")
+
+            time.sleep(max(0.0, args.watch - elapsed))
+    finally:
+        server.shutdown()
+
+def run_apply(args):
+    """--apply: deletes what a --plan file lists, resuming from its journal."""
+    try:
+        entries = DeletePlan.load(args.apply)
+    except (OSError, ValueError) as e:
+        msg = f"Can't read delete plan {args.apply}: {e}"
+        logger.error(msg)
+        if args.output == 'table':
+            console.print(f"[red]{msg}[/red]")
+        else:
+            print(msg, file=sys.stderr)
+        sys.exit(1)
+
+    # Positional org/repo/img narrow the plan down
+    for key, value in (('workspace', args.org), ('repo', args.repo), ('image', args.img)):
+        if value:
+            entries = [e for e in entries if e[key] == value]
+
+    with DeleteJournal(f"{args.apply}.journal") as journal:
+        deleted, failed, skipped = apply_plan(entries, journal)
+
+    logger.info(f"Applied {args.apply}: {len(deleted)} deleted, {len(failed)} failed, {skipped} already done")
+    if args.output == 'table':
+        console.print(f"[bold]Deleted {len(deleted)}[/bold] of {len(entries)} planned packages "
+                      f"({skipped} already done, [red]{len(failed)} failed[/red]). Journal: {journal.path}")
+    else:
+        result = {"plan": args.apply, "journal": journal.path, "planned": len(entries), "deleted": len(deleted),
+                  "skipped": skipped, "failed": sorted(failed)}
+        print(json.dumps(result, indent=2 if args.output == 'json' else None))
+
+    if failed:
+        # Rerunning the same --apply retries just these
+        sys.exit(1)
+
 def main():
-    # Parse args first to configure logging
     parser = argparse.ArgumentParser(description="Docker Multi-Arch Inspector")
-    parser.add_argument("org", help="Cloudsmith Organization/User")
-    parser.add_argument("repo", help="Cloudsmith Repository")
+    parser.add_argument("org", nargs="?", help="Cloudsmith Organization/User")
+    parser.add_argument("repo", nargs="?", help="Cloudsmith Repository")
     parser.add_argument("img", nargs="?", help="Image Name (Optional - if omitted, scans all images)")
+    parser.add_argument("--include", action="append", metavar="GLOB", help="Only scan catalog images matching GLOB (repeatable; e.g. 'team-a/*')")
+    parser.add_argument("--exclude", action="append", metavar="GLOB", help="Skip catalog images matching GLOB (repeatable)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="Keep running: rescan every SECONDS, reusing connections, caches and state, and serve the latest results as metrics")
+    parser.add_argument("--metrics-port", type=int, default=DEFAULT_METRICS_PORT, help=f"Port for the --watch /metrics (Prometheus) and /json endpoints on 127.0.0.1 (default: {DEFAULT_METRICS_PORT})")
+    parser.add_argument("--targets", metavar="FILE", help="Scan every org/repo[/img] listed in FILE ('-' for stdin), one per line, in one process instead of the positional target")
     parser.add_argument("--untagged", action="store_true", help="Find untagged manifest lists")
     parser.add_argument("--untagged-delete", action="store_true", help="Delete untagged manifest lists")
     parser.add_argument("--delete-all", action="store_true", help="Delete ALL detected manifest lists")
     parser.add_argument("--delete-tag", help="Delete manifest lists matching this specific tag")
+    parser.add_argument("--plan", metavar="FILE", help="Dry run for the delete flags: write the manifest lists they select (slug, digest, tag) to FILE instead of deleting")
+    parser.add_argument("--apply", metavar="FILE", help="Delete everything in a --plan FILE, journaling progress to FILE.journal so a rerun resumes where it stopped")
     parser.add_argument("--detailed", action="store_true", help="Show detailed breakdown of digests")
-    parser.add_argument("--output", choices=['table', 'json', 'csv'], default='table', help="Output format (default: table)")
+    parser.add_argument("--output", choices=['table', 'json', 'ndjson', 'csv'], default='table', help="Output format (default: table)")
+    parser.add_argument("--sorted", action="store_true", help="Buffer output and emit images sorted by name instead of as they complete")
+    parser.add_argument("--max-rows", type=int, metavar="N", help="Show at most N rows per image table; the rest is summarized in the table caption")
     parser.add_argument("--debug-log", action="store_true", help="Enable debug logging to file")
+    parser.add_argument("--engine", choices=['thread', 'async'], default='thread', help="Scan engine (default: thread)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Max concurrent units of work / requests across the scan (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Directory for the on-disk manifest cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the on-disk manifest/response cache")
+    parser.add_argument("--since-state", metavar="FILE", help="Incremental scan: only re-inspect tags that changed since the state saved in FILE (created if missing)")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE", help="Print request/stage timings to stderr at exit, or write them as JSON to FILE")
+    parser.add_argument("--summary", action="store_true", help="Print download/status roll-ups (per platform, quarantined tags, top images) instead of per-tag rows")
+    parser.add_argument("--top", type=int, default=SUMMARY_TOP_N, metavar="N", help=f"Number of images in the --summary top-N list (default: {SUMMARY_TOP_N})")
 
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.max_rows is not None and args.max_rows < 1:
+        parser.error("--max-rows must be at least 1")
+    if args.summary and args.output == 'csv':
+        parser.error("--summary supports table, json or ndjson output")
+    if args.targets and args.org:
+        parser.error("--targets replaces the org/repo/img arguments")
+    if args.apply:
+        if args.targets or args.plan or args.untagged or args.untagged_delete or args.delete_all or args.delete_tag or args.summary:
+            parser.error("--apply takes no scan or delete options; the plan file says what to delete")
+        if args.output == 'csv':
+            parser.error("--apply supports table, json or ndjson output")
+    elif not args.repo and not args.targets:
+        parser.error("org and repo are required")
+    if args.plan and not (args.untagged_delete or args.delete_all or args.delete_tag):
+        parser.error("--plan needs --untagged-delete, --delete-all or --delete-tag")
+    if args.watch is not None:
+        if args.watch <= 0:
+            parser.error("--watch needs a positive interval")
+        if args.apply or args.plan or args.untagged_delete or args.delete_all or args.delete_tag or args.summary:
+            parser.error("--watch can't be combined with deletes, --plan/--apply or --summary")
+
+    if args.targets:
+        try:
+            targets = read_targets(args.targets)
+        except (OSError, ValueError) as e:
+            parser.error(f"--targets {args.targets}: {e}")
+        if not targets:
+            parser.error(f"--targets {args.targets}: no targets listed")
+    else:
+        targets = [(args.org, args.repo, args.img)]
 
-    # Re-configure logging based on args
-    global logger
-    logger = setup_logging(args.debug_log)
+    # Configure logging based on args
+    setup_logging(args.debug_log)
 
     logger.info("--- Script Started ---")
-    console.print(r"""[bold cyan]
+    logger.info(f"Arguments: {args}")
+
+    # The banner (and rich itself) is only for interactive table output
+    if args.output == 'table':
+        require_rich()
+        console.print(r"""[bold cyan]
 ██████╗██╗      ██████╗ ██╗   ██╗██████╗ ███████╗███╗   ███╗██╗████████╗██╗  ██╗
 ██╔════╝██║     ██╔═══██╗██║   ██║██╔══██╗██╔════╝████╗ ████║██║╚══██╔══╝██║  ██║
 ██║     ██║     ██║   ██║██║   ██║██║  ██║███████╗██╔████╔██║██║   ██║   ███████║
@@ -662,42 +3202,41 @@ def main():
 ╚═════╝  ╚═════╝  ╚═════╝╚═╝  ╚═╝╚══════╝╚═╝  ╚═╝    ╚══════╝╚══════╝╚══════╝ ╚═════╝    ╚═╝   ╚═╝  ╚═╝
 [/bold cyan]""")
 
-    parser = argparse.ArgumentParser(description="Docker Multi-Arch Inspector")
-    parser.add_argument("org", help="Cloudsmith Organization/User")
-    parser.add_argument("repo", help="Cloudsmith Repository")
-    parser.add_argument("img", nargs="?", help="Image Name (Optional - if omitted, scans all images)")
-    parser.add_argument("--untagged", action="store_true", help="Find untagged manifest lists")
-    parser.add_argument("--untagged-delete", action="store_true", help="Delete untagged manifest lists")
-    parser.add_argument("--delete-all", action="store_true", help="Delete ALL detected manifest lists")
-    parser.add_argument("--delete-tag", help="Delete manifest lists matching this specific tag")
-    parser.add_argument("--detailed", action="store_true", help="Show detailed breakdown of digests")
-    parser.add_argument("--output", choices=['table', 'json', 'csv'], default='table', help="Output format (default: table)")
-    parser.add_argument("--debug-log", action="store_true", help="Enable debug logging to file")
+    if args.profile:
+        profiler.start()
 
-    args = parser.parse_args()
-    logger.info(f"Arguments: {args}")
+    configure(concurrency=args.concurrency)
 
-    images_to_scan = []
+    if args.apply:
+        try:
+            run_apply(args)
+        finally:
+            if args.profile:
+                print_profile(args.profile)
+        return
 
-    if args.img:
-        images_to_scan.append(args.img)
-    else:
-        if args.output == 'table':
-            console.print(f"[bold]Fetching catalog for {args.org}/{args.repo}...[/bold]")
-        
-        logger.info(f"Fetching catalog for {args.org}/{args.repo}")
-        catalog_url = f"{CLOUDSMITH_URL}/v2/{args.org}/{args.repo}/_catalog"
-        catalog_json = make_request(catalog_url, {"Accept": "application/json", "Cache-Control": "no-cache"})
-        
-        if catalog_json and 'repositories' in catalog_json:
-            images_to_scan = catalog_json['repositories']
-            logger.info(f"Found {len(images_to_scan)} images in catalog.")
-        else:
-            msg = "Failed to fetch catalog or no images found."
-            if args.output == 'table':
-                console.print(f"[red]{msg}[/red]")
-            logger.error(msg)
-            sys.exit(1)
+    if not args.no_cache:
+        configure(cache_dir=args.cache_dir)
+
+    global scan_state
+    if args.since_state:
+        scan_state = ScanState(args.since_state)
+
+    global delete_plan
+    if args.plan:
+        delete_plan = DeletePlan(args.plan)
+
+    if args.watch is not None:
+        # Per-platform rows are what the metrics are made of
+        args.detailed = True
+        run_watch(targets, args)
+        return
+
+    if args.output == 'table':
+        for org, repo in dict.fromkeys((org, repo) for org, repo, img in targets if not img):
+            console.print(f"[bold]Fetching catalog for {org}/{repo}...[/bold]")
+    catalog_failures = []
+    job_batches = iter_scan_jobs(targets, args, catalog_failures)
 
     # Only show progress bar for table output
     if args.output == 'table':
@@ -709,110 +3248,105 @@ def main():
             console=console
         )
     else:
-        # Dummy context manager for non-table output
-        class DummyProgress:
-            def __enter__(self): return self
-            def __exit__(self, *args): pass
-            def add_task(self, *args, **kwargs): return None
-            def advance(self, *args, **kwargs): pass
-            def remove_task(self, *args, **kwargs): pass
-            @property
-            def console(self): return console # fallback
         progress_ctx = DummyProgress()
 
+    # --summary folds each image into running totals and keeps no rows. It
+    # needs the per-platform child rows, so they are always built.
+    summary = None
+    if args.summary:
+        summary = Summary(args.top)
+        args.detailed = True
+
+    # Every format streams each image as it completes (tables print above the
+    # progress bar); only --sorted buffers until the scan finishes.
+    writer = OUTPUT_WRITERS[args.output](sys.stdout) if args.output != 'table' and summary is None else None
     collected_results = []
+    tables_printed = 0
+    is_untagged = args.untagged or args.untagged_delete
+    has_action = args.untagged_delete or args.delete_all or (args.delete_tag is not None)
+
+    def show_table(img_name, groups):
+        nonlocal tables_printed
+        print_table(render_table(img_name, groups, is_untagged=is_untagged, has_action=has_action, max_rows=args.max_rows))
+        tables_printed += 1
+
+    def on_result(img_name, groups):
+        if summary is not None:
+            summary.add_image(img_name, groups)
+        elif args.sorted:
+            collected_results.append((img_name, groups))
+        elif writer is None:
+            show_table(img_name, groups)
+        else:
+            writer.write_image(img_name, groups)
 
     with progress_ctx as progress:
+        task = None
         if args.output == 'table':
-            task = progress.add_task(f"Processing {len(images_to_scan)} images...", total=len(images_to_scan))
-        
-        # Use a reasonable number of workers for images (e.g., 5)
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+            # The total grows as catalog pages arrive
+            task = progress.add_task("Processing images...", total=None)
+
+        if args.engine == 'async':
+            failed_images = asyncio.run(scan_images_async(job_batches, args, on_result, progress=progress, task=task))
+        else:
+            failed_images = scan_images_threaded(job_batches, args, on_result, progress=progress, task=task)
+
+    if catalog_failures and not args.targets:
+        sys.exit(1)
+
+    http_client.log_stats()
+    request_coalescer.log_stats()
+    for cache in (manifest_cache, response_cache):
+        if cache is not None:
+            cache.log_stats()
+    if scan_state is not None:
         try:
-            future_to_img = {
-                executor.submit(process_image, args.org, args.repo, img, args, progress=progress): img 
-                for img in images_to_scan
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_img):
-                img_name = future_to_img[future]
-                try:
-                    groups = future.result()
-                    if groups:
-                        collected_results.append((img_name, groups))
-                except Exception as e:
-                    logger.error(f"Error processing {img_name}: {e}")
-                    if args.output == 'table':
-                        progress.console.print(f"[red]Error processing {img_name}: {e}[/red]")
-                
-                if args.output == 'table':
-                    progress.advance(task)
-            
-            # Normal shutdown
-            executor.shutdown(wait=True)
-            
-        except KeyboardInterrupt:
-            # Force shutdown without waiting
-            executor.shutdown(wait=False, cancel_futures=True)
-            raise
+            scan_state.save()
+        except OSError as e:
+            logger.error(f"Failed to save scan state to {scan_state.path}: {e}")
+    if delete_plan is not None:
+        try:
+            delete_plan.save()
+        except OSError as e:
+            msg = f"Failed to write delete plan to {delete_plan.path}: {e}"
+            logger.error(msg)
+            print(msg, file=sys.stderr)
+            sys.exit(1)
 
     # Sort results by image name and print
     collected_results.sort(key=lambda x: x[0])
-    
-    if not collected_results:
-        if args.output == 'table':
-            console.print("[yellow]No matching images or tags found.[/yellow]")
-        elif args.output == 'json':
-            print("[]")
-        logger.info("No matching images or tags found.")
-        return
 
     # --- Output Handling ---
-
-    if args.output == 'table':
-        for img_name, groups in collected_results:
-            is_untagged = args.untagged or args.untagged_delete
-            has_action = args.untagged_delete or args.delete_all or (args.delete_tag is not None)
-            table = render_table(image_name=img_name, groups=groups, is_untagged=is_untagged, has_action=has_action)
-            console.print(table)
-            console.print("")
-    elif args.output == 'json':
-        # JSON Output for all images
-        all_results = {}
-        for img_name, groups in collected_results:
-            all_results[img_name] = groups
-        
-        json_output = json.dumps(all_results, indent=2)
-        console.print(json_output)
-    elif args.output == 'csv':
-        # CSV Output (simple flat structure)
-        csv_lines = []
-        csv_lines.append(["Image", "Tag", "Type", "Platform", "Status", "Downloads", "Digest", "Action"]) # Header
-        
-        for img_name, groups in collected_results:
-            for group in groups:
-                if group == "SECTION":
-                    continue
-                # Flat CSV row
-                csv_lines.append([
-                    img_name,
-                    group.get("tag", ""),
-                    group.get("type", ""),
-                    group.get("platform", ""),
-                    group.get("status", ""),
-                    str(group.get("downloads", 0)),
-                    group.get("digest", ""),
-                    group.get("action", "")
-                ])
-        
-        # Print CSV
-        for line in csv_lines:
-            console.print(",".join(f'"{str(item)}"' for item in line))
+    try:
+        if summary is not None:
+            print_summary(summary, args.output)
+        elif writer is not None:
+            for img_name, groups in collected_results:
+                writer.write_image(img_name, groups)
+            writer.close()
+            if not writer.count:
+                logger.info("No matching images or tags found.")
+        else:
+            for img_name, groups in collected_results:
+                show_table(img_name, groups)
+            if not tables_printed:
+                console.print("[yellow]No matching images or tags found.[/yellow]")
+                logger.info("No matching images or tags found.")
+    finally:
+        if delete_plan is not None and args.output == 'table':
+            console.print(f"[bold]Planned {len(delete_plan)} deletions in {delete_plan.path}[/bold] (run with --apply {delete_plan.path} to delete them)")
+        if args.profile:
+            print_profile(args.profile)
+
+    if failed_images:
+        # Their errors were logged as they happened; the results above leave them out
+        logger.error(f"{len(failed_images)} images failed: {', '.join(sorted(failed_images))}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        console.print("\n[bold red]Operation cancelled by user.[/bold red]")
+        (console or PlainConsole()).print("\n[bold red]Operation cancelled by user.[/bold red]")
         # Use os._exit to avoid hanging on shutdown
         os._exit(0)
@@ -4,12 +4,15 @@ set -euo pipefail
 # Parse args for flags
 UNTAGGED=false
 UNTAGGED_DELETE=false
+BATCH=false
 ARGS=()
 for arg in "$@"; do
   if [[ "$arg" == "--untagged" ]]; then
     UNTAGGED=true
   elif [[ "$arg" == "--untagged-delete" ]]; then
     UNTAGGED_DELETE=true
+  elif [[ "$arg" == "--batch" ]]; then
+    BATCH=true
   else
     ARGS+=("$arg")
   fi
@@ -17,6 +20,7 @@ done
 set -- "${ARGS[@]}"
 
 # Usage: ./run.sh <org> <repo> <img>
+#        --batch: fetch everything with one parallel curl per phase (curl >= 7.67)
 # Requires: curl, jq
 # Auth: export CLOUDSMITH_API_KEY=<your_token> 
 
@@ -48,6 +52,7 @@ IMG="${4:-}"
 if [[ -z "${CLOUDSMITH_URL}" ]]; then
   CLOUDSMITH_URL="https://docker.cloudsmith.io"
 fi
+CLOUDSMITH_API_URL="${CLOUDSMITH_API_URL:-https://api.cloudsmith.io}"
 
 # authorization header
 AUTH_HEADER=()
@@ -164,7 +169,7 @@ getDockerDigests () {
 
   local nTAG="$1"
   local totalDownloads=0
-  API_BASE="https://api.cloudsmith.io/v1/packages/${WORKSPACE}/${REPO}/"
+  API_BASE="${CLOUDSMITH_API_URL}/v1/packages/${WORKSPACE}/${REPO}/"
 
   # index_digest="$(curl -fsSL "${AUTH_HEADER[@]}" \
   #   -H "Accept: application/vnd.oci.image.manifest.v1+json" \
@@ -210,7 +215,7 @@ getDockerDigests () {
 
 getUntaggedImages() {
   echo "Searching for untagged manifest lists..."
-  API_BASE="https://api.cloudsmith.io/v1/packages/${WORKSPACE}/${REPO}/"
+  API_BASE="${CLOUDSMITH_API_URL}/v1/packages/${WORKSPACE}/${REPO}/"
   
   # Fetch list
   PACKAGES_JSON="$(curl -sS "${AUTH_HEADER[@]}" \
@@ -294,7 +299,7 @@ getUntaggedImages() {
      if $UNTAGGED_DELETE; then
         echo "   Deleting package: ${slug}..."
         curl -sS -X DELETE "${AUTH_HEADER[@]}" \
-          "https://api.cloudsmith.io/v1/packages/${WORKSPACE}/${REPO}/${slug}/"
+          "${CLOUDSMITH_API_URL}/v1/packages/${WORKSPACE}/${REPO}/${slug}/"
         echo "   Deleted."
         echo "$SEP_LINE"
      fi
@@ -302,9 +307,209 @@ getUntaggedImages() {
 }
 
 
+# --- Batched mode (--batch) ---
+# One curl process per phase instead of one per tag and digest: manifests and
+# listing pages come from a single `curl --parallel` run over kept-alive
+# connections, and each table is built by one jq pass over the paginated
+# package listing and every manifest.
+
+BATCH_PARALLEL="${BATCH_PARALLEL:-16}"
+PAGE_SIZE=500
+
+# Shared jq: the package lookup and the rows for one tag's manifest,
+# following the same digest/platform rules as getDockerDigests/getDigestData
+ROWS_JQ='
+  def packages: [$pkgs[][] | {key: ((.version // "") | sub("^sha256:"; "")), value: .}] | from_entries;
+  def digests:
+    if type == "object" and (.manifests? // empty) and ([.manifests[].platform.architecture] | any) then
+      [.manifests[] | select((.platform.architecture // "unknown") | ascii_downcase != "unknown") | .digest]
+    else
+      [.. | objects | .digest? // empty]
+    end | unique[];
+  def platform($d):
+    [ if type == "object" and (.manifests? // empty) then
+        .manifests[] | select(.digest == $d) | ((.platform.os // "") + "/" + (.platform.architecture // ""))
+      else
+        .. | objects | .architecture? // empty
+      end ] | unique | if length == 0 then "unknown" else join(" ") end;
+  def rows($tag; $byVersion):
+    . as $m | digests as $d
+    | ($byVersion[$d | sub("^sha256:"; "")] // {}) as $p
+    | ["C", $tag, ($m | platform($d)), ($p.status_str // ""), ($p.downloads // 0), $d] | @tsv;
+'
+
+statusDisplay () {
+  case "$1" in
+    "")            printf '' ;;
+    Completed)     printf '%s %s ' "$1" "${CHECK}" ;;
+    "In Progress") printf '%s %s ' "$1" "${TIMER}" ;;
+    Quarantined)   printf '%s %s ' "$1" "${VULN}" ;;
+    Failed)        printf '%s %s ' "$1" "${CROSS}" ;;
+    *)             printf '%s ' "$1" ;;
+  esac
+}
+
+# Fetches every "<url> <output file>" line on stdin with one curl process;
+# extra arguments (headers, -X ...) apply to all of them
+fetchParallel () {
+  local config="${BATCH_DIR}/curl.cfg" url out
+  : > "${config}"
+  while read -r url out; do
+    printf 'url = "%s"\noutput = "%s"\n' "${url}" "${out}" >> "${config}"
+  done
+  [[ -s "${config}" ]] || return 0
+  # Failed transfers are reported on stderr and leave no output file
+  curl -L -sS --no-progress-meter --fail --parallel --parallel-max "${BATCH_PARALLEL}" "${AUTH_HEADER[@]}" "$@" -K "${config}" || true
+}
+
+# Writes every docker package of the image, across all pages, to packages.json
+fetchPackageListing () {
+  local query base count pages p
+  query="$(jq -rn --arg q "format:docker AND name:${IMG}" '$q | @uri')"
+  base="${CLOUDSMITH_API_URL}/v1/packages/${WORKSPACE}/${REPO}/?query=${query}&page_size=${PAGE_SIZE}"
+  mkdir -p "${BATCH_DIR}/pages"
+
+  # Page 1 tells us how many more there are
+  curl -sS --fail "${AUTH_HEADER[@]}" -H "Cache-Control: no-cache" \
+    -D "${BATCH_DIR}/pages/headers" -o "${BATCH_DIR}/pages/1.json" "${base}&page=1" || true
+  count="$(awk -F': *' 'tolower($1) == "x-pagination-count" { print $2 + 0 }' "${BATCH_DIR}/pages/headers" 2>/dev/null)"
+  pages=$(( (${count:-0} + PAGE_SIZE - 1) / PAGE_SIZE ))
+
+  for (( p = 2; p <= pages; p++ )); do
+    echo "${base}&page=${p} ${BATCH_DIR}/pages/${p}.json"
+  done | fetchParallel -H "Cache-Control: no-cache"
+
+  local files=()
+  for (( p = 1; p <= (pages > 0 ? pages : 1); p++ )); do
+    [[ -f "${BATCH_DIR}/pages/${p}.json" ]] && files+=("${BATCH_DIR}/pages/${p}.json")
+  done
+  if (( ${#files[@]} == 0 )); then
+    echo "[]" > "${BATCH_DIR}/packages.json"
+  else
+    jq -s '[.[] | arrays | .[]]' "${files[@]}" > "${BATCH_DIR}/packages.json"
+  fi
+}
+
+# Prints the TSV rows produced by the jq passes below
+printRows () {
+  local kind tag platform status dl digest
+  while IFS=$'\t' read -r kind tag platform status dl digest; do
+    printf "$TBL_FMT" "${tag}" "${platform}" "$(statusDisplay "${status}")" "${dl}" "${digest}"
+    echo "$SEP_LINE"
+  done
+}
+
+getDockerDigestsBatch () {
+  local t files=()
+  mkdir -p "${BATCH_DIR}/manifests"
+  for t in "${images[@]}"; do
+    echo "${CLOUDSMITH_URL}/v2/${WORKSPACE}/${REPO}/${IMG}/manifests/${t} ${BATCH_DIR}/manifests/${t}.json"
+  done | fetchParallel -H "Accept: application/vnd.oci.image.manifest.v1+json" -H "Cache-Control: no-cache"
+  fetchPackageListing
+
+  # In tag order, as the serial mode prints them
+  for t in "${images[@]}"; do
+    [[ -f "${BATCH_DIR}/manifests/${t}.json" ]] && files+=("${BATCH_DIR}/manifests/${t}.json")
+  done
+  (( ${#files[@]} > 0 )) || return 0
+
+  jq -rn --slurpfile pkgs "${BATCH_DIR}/packages.json" "${ROWS_JQ}"'
+    packages as $byVersion
+    | inputs
+    | rows(input_filename | split("/") | last | rtrimstr(".json"); $byVersion)
+  ' "${files[@]}" | printRows
+}
+
+getUntaggedImagesBatch () {
+  echo "Searching for untagged manifest lists..."
+  fetchPackageListing
+
+  # version, status, downloads, slug of every untagged manifest list
+  mapfile -t UNTAGGED_PKGS < <(jq -r '
+    .[]
+    | select(.type_display == "manifest/list")
+    | select(.tags.version == null or (.tags.version | length == 0))
+    | [ .version, .status_str, (.downloads // 0), .slug ] | @tsv
+  ' "${BATCH_DIR}/packages.json")
+
+  if (( ${#UNTAGGED_PKGS[@]} == 0 )); then
+    echo "No untagged manifest lists found."
+    return
+  fi
+
+  local pkg digest status downloads slug slugs=()
+  mkdir -p "${BATCH_DIR}/manifests"
+  for pkg in "${UNTAGGED_PKGS[@]}"; do
+    IFS=$'\t' read -r digest status downloads slug <<< "$pkg"
+    slugs+=("${slug}")
+    echo "${CLOUDSMITH_URL}/v2/${WORKSPACE}/${REPO}/${IMG}/manifests/sha256:${digest#sha256:} ${BATCH_DIR}/manifests/${digest#sha256:}.json"
+  done | fetchParallel -H "Accept: application/vnd.oci.image.manifest.v1+json" -H "Cache-Control: no-cache"
+
+  local files=()
+  shopt -s nullglob
+  files=("${BATCH_DIR}"/manifests/*.json)
+  shopt -u nullglob
+
+  echo
+  echo "$SEP_LINE"
+  printf "$TBL_FMT" "TAG" "PLATFORM" "STATUS" "DOWNLOADS" "DIGEST"
+  echo "$SEP_LINE"
+
+  if (( ${#files[@]} == 0 )); then
+    echo "No manifests could be fetched for the ${#UNTAGGED_PKGS[@]} untagged manifest lists."
+    echo "$SEP_LINE"
+  else
+    # Parent row plus child rows for each untagged list, in listing order
+    jq -rn --slurpfile pkgs "${BATCH_DIR}/packages.json" --arg dir "${BATCH_DIR}/manifests" "${ROWS_JQ}"'
+      packages as $byVersion
+      | (reduce inputs as $m ({}; . + {(input_filename | split("/") | last | rtrimstr(".json")): $m})) as $manifests
+      | $pkgs[][]
+      | select(.type_display == "manifest/list")
+      | select(.tags.version == null or (.tags.version | length == 0))
+      | ((.version // "") | sub("^sha256:"; "")) as $v
+      | ($manifests[$v] // {}) as $m
+      | (["P", "(untagged) [List]",
+          (if $m.manifests then [$m.manifests[] | ((.platform.os // "linux") + "/" + (.platform.architecture // "unknown"))] | unique | join(" ") else "unknown" end),
+          (.status_str // ""), (.downloads // 0), ("sha256:" + $v)] | @tsv),
+        ($m | rows("(untagged)"; $byVersion))
+    ' "${files[@]}" 2>/dev/null | printRows
+  fi
+
+  if $UNTAGGED_DELETE; then
+    echo "Deleting ${#UNTAGGED_PKGS[@]} packages..."
+    local code url
+    for pkg in "${UNTAGGED_PKGS[@]}"; do
+      IFS=$'\t' read -r digest status downloads slug <<< "$pkg"
+      echo "${CLOUDSMITH_API_URL}/v1/packages/${WORKSPACE}/${REPO}/${slug}/ /dev/null"
+    done | fetchParallel -X DELETE -w '%{http_code} %{url_effective}\n' | while read -r code url; do
+      slug="${url%/}"; slug="${slug##*/}"
+      if [[ "${code}" == 2* ]]; then
+        echo "   Deleted package: ${slug}"
+      else
+        echo "   Failed to delete package: ${slug} (HTTP ${code})"
+      fi
+    done
+    echo "$SEP_LINE"
+  fi
+}
+
+if $BATCH; then
+  if ! printf '%s\n' 7.67.0 "$(curl --version | awk 'NR == 1 { print $2 }')" | sort -V -C; then
+    echo "--batch needs curl 7.67 or newer (for --parallel and --no-progress-meter)." >&2
+    exit 1
+  fi
+  BATCH_DIR="$(mktemp -d)"
+  trap 'rm -rf "${BATCH_DIR}"' EXIT
+fi
+
+
 # Lookup Docker multi-arch images and output an overview
 if $UNTAGGED; then
-  getUntaggedImages
+  if $BATCH; then
+    getUntaggedImagesBatch
+  else
+    getUntaggedImages
+  fi
 else
   getDockerTags
   read -r -a images <<< "$nTAGS"
@@ -320,9 +525,13 @@ else
   printf "$TBL_FMT" "TAG" "PLATFORM" "STATUS" "DOWNLOADS" "DIGEST"
   echo "$SEP_LINE"
 
-  for t in "${!images[@]}"; do
-    getDockerDigests "${images[t]}"
-  done
+  if $BATCH; then
+    getDockerDigestsBatch
+  else
+    for t in "${!images[@]}"; do
+      getDockerDigests "${images[t]}"
+    done
+  fi
 fi
 
 
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import urllib.request
+
+import pytest
+
+TOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Docker", "Cloudsmith Docker Sleuth")
+SCRIPT = os.path.join(TOOL_DIR, "multiarch.py")
+sys.path.insert(0, TOOL_DIR)
+sys.path.insert(0, os.path.join(TOOL_DIR, "bench"))
+
+import multiarch
+from fake_registry import Behaviour, Dataset, serve
+
+
+def run_script(*args, env=None, cwd=None):
+    """Runs multiarch.py in a subprocess; returns the CompletedProcess."""
+    return subprocess.run([sys.executable, SCRIPT, *args], env=env, cwd=cwd, capture_output=True, text=True, timeout=60, check=False)
+
+
+def registry_stats(url):
+    with urllib.request.urlopen(f"{url}/_stats") as response:
+        return json.load(response)
+
+
+def reset_registry_stats(url):
+    urllib.request.urlopen(f"{url}/_reset").close()
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    """Starts a fake registry for Dataset(**kwargs) and points multiarch at it; returns its base URL."""
+    servers = []
+
+    def start(behaviour=None, **kwargs):
+        server = serve(Dataset(**kwargs), behaviour or Behaviour())
+        servers.append(server)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        monkeypatch.setattr(multiarch, "CLOUDSMITH_URL", url)
+        monkeypatch.setattr(multiarch, "CLOUDSMITH_API_URL", url)
+        multiarch.request_coalescer.clear()
+        return url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def run_cli(tmp_path):
+    """Runs multiarch.py against a fake registry URL; returns parsed JSON stdout."""
+
+    def run(url, *args):
+        env = dict(os.environ, CLOUDSMITH_URL=url, CLOUDSMITH_API_URL=url, CLOUDSMITH_API_KEY="test",
+                   XDG_CACHE_HOME=str(tmp_path / "cache"))
+        proc = run_script(*args, env=env, cwd=tmp_path)
+        assert proc.returncode == 0, proc.stderr
+        return json.loads(proc.stdout)
+
+    return run
@@ -0,0 +1,48 @@
+import multiarch
+import pytest
+from conftest import run_script
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+@pytest.mark.parametrize("concurrency", ["0", "-1"])
+def test_concurrency_must_be_positive(engine, concurrency):
+    proc = run_script("ws", "repo", "--engine", engine, "--concurrency", concurrency)
+
+    assert proc.returncode == 2
+    assert "--concurrency must be at least 1" in proc.stderr
+    assert "Traceback" not in proc.stderr
+
+
+def scan(engine, jobs, args):
+    results = {}
+
+    def on_result(img_name, groups):
+        results[img_name] = groups
+
+    batches = iter([jobs])
+    if engine == "async":
+        failed = multiarch.asyncio.run(multiarch.scan_images_async(batches, args, on_result, progress=multiarch.DummyProgress()))
+    else:
+        failed = multiarch.scan_images_threaded(batches, args, on_result, progress=multiarch.DummyProgress())
+    return results, failed
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_failed_images_are_returned(monkeypatch, engine):
+    def process(org, repo, img_name, *args, **kwargs):
+        if img_name == "broken":
+            raise RuntimeError("boom")
+        return [["rows of " + img_name]]
+
+    async def process_async(engine, org, repo, img_name, *args, **kwargs):
+        return process(org, repo, img_name)
+
+    monkeypatch.setattr(multiarch, "console", None)
+    monkeypatch.setattr(multiarch, "process_image", process)
+    monkeypatch.setattr(multiarch, "process_image_async", process_async)
+    args = multiarch.argparse.Namespace(output="json", concurrency=4)
+
+    results, failed = scan(engine, [("ws", "repo", name, name) for name in ("ok", "broken")], args)
+
+    assert results == {"ok": [["rows of ok"]]}
+    assert failed == ["broken"]
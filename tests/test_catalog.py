@@ -0,0 +1,17 @@
+import multiarch
+from fake_registry import Behaviour
+
+
+def test_catalog_follows_link_pages(fake_registry):
+    fake_registry(behaviour=Behaviour(catalog_page_size=2), images=5, tags=1, platforms=1, untagged=0)
+
+    assert list(multiarch.iter_catalog("ws", "repo")) == [["img0", "img1"], ["img2", "img3"], ["img4"]]
+
+
+def test_filter_images():
+    names = ["api", "api-debug", "web", "tools/builder", "tools/debug"]
+
+    assert multiarch.filter_images(names) == names
+    assert multiarch.filter_images(names, include=["api*", "tools/*"]) == ["api", "api-debug", "tools/builder", "tools/debug"]
+    assert multiarch.filter_images(names, exclude=["*debug"]) == ["api", "web", "tools/builder"]
+    assert multiarch.filter_images(names, include=["tools/*"], exclude=["*debug"]) == ["tools/builder"]
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import multiarch
+import pytest
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://docker.example/v2/ws/repo/img/manifests/sha256:" + "a" * 64, True),
+    ("https://api.example/v1/packages/ws/repo/?query=version:" + "b" * 64, True),
+    ("https://api.example/v1/packages/ws/repo/?query=version:latest", False),
+    ("https://docker.example/v2/ws/repo/img/manifests/latest", False),
+    ("https://api.example/v1/packages/ws/repo/?query=format%3Adocker+AND+name%3Aimg&page_size=500", False),
+])
+def test_only_content_addressed_gets_are_memoized(url, expected):
+    assert multiarch.content_addressed(url) is expected
+
+
+def test_identical_calls_in_flight_share_one_result():
+    flight = multiarch.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"n": len(calls)}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+    follower.start()
+    while not flight.coalesced:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == [{"n": 1}, {"n": 1}]
+    assert calls == [1]
+    # Not memoized: the next call goes out again
+    assert flight.do("k", fetch) == {"n": 2}
+
+
+def test_memoized_results_last_until_cleared():
+    flight = multiarch.SingleFlight()
+
+    assert flight.do("k", lambda: 1, memoize=True) == 1
+    assert flight.do("k", lambda: 2, memoize=True) == 1
+    flight.clear()
+    assert flight.do("k", lambda: 3, memoize=True) == 3
+
+
+def test_listing_is_reread_after_delete(fake_registry):
+    fake_registry(images=1, tags=1, platforms=2, untagged=3)
+
+    groups = multiarch.get_untagged_images("ws", "repo", "img0", delete=True)
+    assert [group[0].action for group in groups] == ["Deleted"] * 3
+
+    assert multiarch.get_untagged_images("ws", "repo", "img0") is None
@@ -0,0 +1,53 @@
+import json
+import urllib.request
+
+import multiarch
+from conftest import registry_stats
+
+
+def untagged_slugs():
+    multiarch.request_coalescer.clear()
+    return sorted(slug for _, _, slug in multiarch.iter_untagged_results("ws", "repo", "img0", False, None))
+
+
+def delete(url, slug):
+    request = urllib.request.Request(f"{url}/v1/packages/ws/repo/{slug}/", method="DELETE")
+    urllib.request.urlopen(request).close()
+
+
+def test_plan_then_apply_with_journal_resume_and_404(fake_registry, run_cli, tmp_path):
+    url = fake_registry(images=1, tags=1, platforms=2, untagged=3)
+    plan = tmp_path / "plan.json"
+
+    run_cli(url, "ws", "repo", "img0", "--untagged-delete", "--plan", str(plan), "--output", "json")
+
+    entries = json.loads(plan.read_text())["deletions"]
+    slugs = untagged_slugs()
+    assert sorted(e["slug"] for e in entries) == slugs
+    assert "delete" not in registry_stats(url)["by_endpoint"]
+
+    # An earlier run got as far as the first slug; the second went some other way
+    (tmp_path / "plan.json.journal").write_text(json.dumps({"slug": slugs[0], "status": "deleted"}) + "\n")
+    delete(url, slugs[0])
+    delete(url, slugs[1])
+
+    result = run_cli(url, "--apply", str(plan), "--output", "json")
+
+    assert (result["planned"], result["skipped"], result["deleted"], result["failed"]) == (3, 1, 2, [])
+    assert untagged_slugs() == []
+
+    again = run_cli(url, "--apply", str(plan), "--output", "json")
+    assert (again["skipped"], again["deleted"]) == (3, 0)
+
+
+def test_journal_tolerates_a_torn_last_line(tmp_path):
+    path = tmp_path / "plan.json.journal"
+    path.write_text(json.dumps({"slug": "a", "status": "deleted"}) + "\n"
+                    + json.dumps({"slug": "b", "status": "failed"}) + "\n" + '{"slug": "c", "sta')
+
+    with multiarch.DeleteJournal(str(path)) as journal:
+        assert journal.done == {"a"}
+        journal.record("b", True)
+
+    assert multiarch.DeleteJournal(str(path)).done == {"a", "b"}
+    assert path.read_text().splitlines()[-1].startswith('{"slug": "b", "status": "deleted"')
@@ -0,0 +1,61 @@
+import os
+import time
+
+import multiarch
+
+
+def digest(n):
+    return "sha256:" + f"{n:x}" * 64
+
+
+def value(size):
+    # Serializes to exactly `size` bytes
+    return {"v": "x" * (size - len('{"v":""}'))}
+
+
+def test_round_trip(tmp_path):
+    cache = multiarch.ManifestCache(str(tmp_path))
+    manifest = {"schemaVersion": 2, "manifests": []}
+
+    cache.put(digest(1), manifest)
+
+    assert cache.get(digest(1)) == manifest
+    assert cache.get(digest(2)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_unusable_keys_are_not_cached(tmp_path):
+    cache = multiarch.ManifestCache(str(tmp_path))
+
+    cache.put("latest", {"a": 1})
+
+    assert cache.get("latest") is None
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = multiarch.ManifestCache(str(tmp_path), max_bytes=350)
+    for n in (1, 2, 3):
+        cache.put(digest(n), value(100))
+    # Oldest first, then reading 1 makes it the most recently used
+    now = time.time()
+    for n, age in ((1, 30), (2, 20), (3, 10)):
+        os.utime(cache._path(digest(n)), (now - age, now - age))
+    assert cache.get(digest(1)) == value(100)
+
+    cache.put(digest(4), value(100))
+
+    assert cache.get(digest(2)) is None
+    for n in (1, 3, 4):
+        assert cache.get(digest(n)) == value(100)
+
+
+def test_unreadable_entries_are_discarded(tmp_path):
+    cache = multiarch.ManifestCache(str(tmp_path))
+    cache.put(digest(1), {"a": 1})
+    path = cache._path(digest(1))
+    with open(path, "w") as f:
+        f.write("{not json")
+
+    assert cache.get(digest(1)) is None
+    assert not os.path.exists(path)
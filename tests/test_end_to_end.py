@@ -0,0 +1,27 @@
+import pytest
+from conftest import registry_stats, reset_registry_stats
+
+
+@pytest.mark.parametrize("mode", [["--detailed"], ["--untagged", "--detailed"]], ids=["tags", "untagged"])
+def test_engines_produce_the_same_json(fake_registry, run_cli, mode):
+    url = fake_registry(images=3, tags=2, platforms=3, untagged=2, single=1)
+
+    results = [
+        run_cli(url, "ws", "repo", *mode, "--output", "json", "--sorted", "--no-cache", "--engine", engine)
+        for engine in ("thread", "async")
+    ]
+
+    assert list(results[0]) == ["img0", "img1", "img2"]
+    assert results[0] == results[1]
+
+
+def test_tag_manifests_come_from_the_cache_on_a_second_run(fake_registry, run_cli):
+    url = fake_registry(images=1, tags=3, platforms=2, untagged=0)
+    args = (url, "ws", "repo", "img0", "--detailed", "--output", "json")
+
+    first = run_cli(*args)
+    reset_registry_stats(url)
+    second = run_cli(*args)
+
+    assert second == first
+    assert "manifest" not in registry_stats(url)["by_endpoint"]
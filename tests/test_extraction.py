@@ -0,0 +1,30 @@
+import multiarch
+import pytest
+
+
+def tags_by_name(groups):
+    return {group[0].tag: group for group in groups}
+
+
+def test_single_platform_tag_keeps_its_row(fake_registry):
+    fake_registry(images=1, tags=1, platforms=2, untagged=0, single=1)
+
+    groups = tags_by_name(multiarch.Scanner("ws", "repo").iter_tags("img0", detailed=True))
+
+    assert set(groups) == {"v0", "latest", "solo0"}
+    solo = groups["solo0"]
+    assert len(solo) == 1
+    assert solo[0].type == "image"
+    assert solo[0].status == "Completed"
+    assert solo[0].slug
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_single_platform_tag_in_cli_output(fake_registry, run_cli, engine):
+    url = fake_registry(images=1, tags=1, platforms=2, untagged=0, single=1)
+
+    groups = run_cli(url, "ws", "repo", "img0", "--detailed", "--output", "json", "--engine", engine)["img0"]
+
+    solo = [row for group in groups for row in group if row["tag"] == "solo0"]
+    assert [(row["type"], row["is_child"]) for row in solo] == [("image", False)]
+
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import multiarch
+import pytest
+from conftest import TOOL_DIR
+
+
+def test_import_does_not_load_rich():
+    code = "import sys, multiarch; print('rich' in sys.modules)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=TOOL_DIR, capture_output=True, text=True, timeout=30, check=True)
+
+    assert proc.stdout.strip() == "False"
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_image_errors_reach_stderr_in_machine_readable_modes(monkeypatch, capsys, engine):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    async def fail_async(*args, **kwargs):
+        fail()
+
+    monkeypatch.setattr(multiarch, "console", None)
+    monkeypatch.setattr(multiarch, "process_image", fail)
+    monkeypatch.setattr(multiarch, "process_image_async", fail_async)
+    args = multiarch.argparse.Namespace(output="json", concurrency=4)
+    jobs = [[("ws", "repo", "img0", "img0")]]
+    results = []
+
+    if engine == "async":
+        multiarch.asyncio.run(multiarch.scan_images_async(iter(jobs), args, results.append, progress=multiarch.DummyProgress()))
+    else:
+        multiarch.scan_images_threaded(iter(jobs), args, results.append, progress=multiarch.DummyProgress())
+
+    captured = capsys.readouterr()
+    assert results == []
+    assert captured.out == ""
+    assert "Error processing img0: boom" in captured.err
@@ -0,0 +1,14 @@
+import multiarch
+import pytest
+
+
+@pytest.mark.parametrize("method, url, expected", [
+    ("GET", "https://api.example/v1/packages/ws/repo/?query=version:" + "c" * 64, "api package lookup"),
+    ("GET", "https://api.example/v1/packages/ws/repo/?query=version:latest", "api package lookup"),
+    ("GET", "https://api.example/v1/packages/ws/repo/?query=version%3Alatest", "api package lookup"),
+    ("GET", "https://api.example/v1/packages/ws/repo/?query=format%3Adocker+AND+name%3Aimg&page_size=500", "api package list"),
+    ("DELETE", "https://api.example/v1/packages/ws/repo/slug-1/", "api package delete"),
+    ("GET", "https://docker.example/v2/ws/repo/img/manifests/sha256:" + "d" * 64, "registry manifest (digest)"),
+])
+def test_endpoint_class(method, url, expected):
+    assert multiarch.endpoint_class(method, url) == expected
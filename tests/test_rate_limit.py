@@ -0,0 +1,33 @@
+import multiarch
+import pytest
+
+
+def test_budget_counts_requests_in_flight():
+    bucket = multiarch.TokenBucket("api.example")
+    for _ in range(5):
+        bucket.acquire()
+    reset = f"{multiarch.time.time() + 10:.3f}"
+
+    # 5 of the 6 remaining are already spoken for by requests still in flight
+    bucket.update({"X-RateLimit-Remaining": "6", "X-RateLimit-Reset": reset})
+    assert bucket.paused_until > multiarch.time.monotonic()
+
+    for _ in range(5):
+        bucket.release()
+    bucket.paused_until = 0.0
+    bucket.update({"X-RateLimit-Remaining": "41", "X-RateLimit-Reset": reset})
+    assert bucket.rate == pytest.approx(4.0, rel=0.05)
+
+
+def test_probes_before_the_quota_is_known():
+    bucket = multiarch.TokenBucket("api.example")
+    for _ in range(multiarch.RATE_LIMIT_MAX_BURST):
+        bucket.acquire()
+    assert bucket.inflight == multiarch.RATE_LIMIT_MAX_BURST
+
+    # The first response, even without quota headers, lifts the cap
+    bucket.release()
+    bucket.update({})
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket.inflight == multiarch.RATE_LIMIT_MAX_BURST + 1
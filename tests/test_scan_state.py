@@ -0,0 +1,77 @@
+import multiarch
+import pytest
+
+PARENT = "a" * 64
+CHILDREN = {"b" * 64: "linux/amd64", "c" * 64: "linux/arm64"}
+
+
+def listing(parent=PARENT, status="Completed", child_status="Completed"):
+    packages = [{"version": parent, "type_display": "manifest/list", "status_str": status, "downloads": 5,
+                 "slug": "slug-parent", "tags": {"version": ["v1"]}}]
+    packages += [{"version": digest, "type_display": "image", "status_str": child_status, "downloads": 2,
+                  "slug": f"slug-{digest[:4]}", "tags": {}} for digest in CHILDREN]
+    index = multiarch.PackageIndex()
+    index.add_all(packages)
+    index.mark_complete()
+    return index
+
+
+def record(state, index):
+    children = [multiarch.build_digest_row(f"sha256:{digest}", "v1", platform, index.get_version(digest))
+                for digest, platform in CHILDREN.items()]
+    state.record_tag("ws", "repo", "img", "v1", index.get_tag("v1"), children)
+
+
+@pytest.fixture
+def saved_state(tmp_path):
+    """Returns a function recording v1 from a listing into a state file and loading it back."""
+    path = str(tmp_path / "state.json")
+
+    def save(index):
+        state = multiarch.ScanState(path)
+        record(state, index)
+        state.save()
+        return multiarch.ScanState(path)
+
+    return save
+
+
+def test_unchanged_tag_is_rebuilt_from_the_state(saved_state):
+    state = saved_state(listing())
+
+    rows = state.reuse_tag("ws", "repo", "img", "v1", listing(), detailed=True)
+
+    assert rows is not None
+    assert len(rows) == 1 + len(CHILDREN)
+    assert state.reused == 1
+
+
+def test_moved_tag_is_fetched_again(saved_state):
+    state = saved_state(listing())
+
+    assert state.reuse_tag("ws", "repo", "img", "v1", listing(parent="d" * 64)) is None
+    assert state.reused == 0
+
+
+@pytest.mark.parametrize("statuses", [{"status": "In Progress"}, {"child_status": "In Progress"}])
+def test_tags_still_in_progress_are_fetched_again(saved_state, statuses):
+    state = saved_state(listing(**statuses))
+
+    assert state.reuse_tag("ws", "repo", "img", "v1", listing()) is None
+
+
+def test_unknown_tags_and_pruned_images_are_fetched(saved_state):
+    state = saved_state(listing())
+
+    assert state.reuse_tag("ws", "repo", "img", "v2", listing()) is None
+    state.prune("ws", "repo", "img", ["v2"])
+    assert state.reuse_tag("ws", "repo", "img", "v1", listing()) is None
+
+
+def test_unreadable_state_starts_empty(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+
+    state = multiarch.ScanState(str(path))
+
+    assert state.reuse_tag("ws", "repo", "img", "v1", listing()) is None
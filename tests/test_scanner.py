@@ -0,0 +1,63 @@
+import urllib.request
+
+import multiarch
+from fake_registry import Behaviour
+
+
+def untagged_slugs():
+    multiarch.request_coalescer.clear()
+    return sorted(slug for _, _, slug in multiarch.iter_untagged_results("ws", "repo", "img0"))
+
+
+def test_closing_delete_early_cancels_the_rest(fake_registry, monkeypatch):
+    fake_registry(behaviour=Behaviour(latency=0.05), images=1, tags=0, platforms=1, untagged=6)
+    slugs = untagged_slugs()
+    scheduler = multiarch.Scheduler(1)
+    monkeypatch.setattr(multiarch, "scheduler", scheduler)
+
+    deletes = multiarch.Scanner("ws", "repo").delete(slugs)
+    slug, success = next(deletes)
+    deletes.close()
+    remaining = untagged_slugs()
+    scheduler.shutdown()
+
+    assert success and slug in slugs
+    assert slug not in remaining
+    assert len(remaining) >= 3
+
+
+def test_each_iteration_reads_fresh_results(fake_registry):
+    url = fake_registry(images=1, tags=1, platforms=2, untagged=2)
+    scanner = multiarch.Scanner("ws", "repo")
+    first = [group[0].slug for group in scanner.iter_untagged("img0")]
+
+    request = urllib.request.Request(f"{url}/v1/packages/ws/repo/{first[0]}/", method="DELETE")
+    urllib.request.urlopen(request).close()
+
+    assert [group[0].slug for group in scanner.iter_untagged("img0")] == first[1:]
+
+
+def test_configure_resizes_the_connection_pools(fake_registry, monkeypatch):
+    url = fake_registry(images=1, tags=1, platforms=1, untagged=0)
+    client = multiarch.HTTPClient()
+    monkeypatch.setattr(multiarch, "http_client", client)
+    monkeypatch.setattr(multiarch, "scheduler", multiarch.Scheduler(1))
+    assert multiarch.make_request(f"{url}/v2/_catalog?n=1")
+
+    multiarch.configure(concurrency=multiarch.HTTP_POOL_SIZE * 2)
+
+    assert multiarch.scheduler.workers == multiarch.HTTP_POOL_SIZE * 2
+    assert client.pool_size == multiarch.HTTP_POOL_SIZE * 2
+    assert client.stats() == {}
+    multiarch.scheduler.shutdown()
+
+
+def test_configure_rejects_no_concurrency(monkeypatch):
+    monkeypatch.setattr(multiarch, "scheduler", multiarch.Scheduler(1))
+
+    try:
+        multiarch.configure(concurrency=0)
+    except ValueError as e:
+        assert "at least 1" in str(e)
+    else:
+        raise AssertionError("configure(concurrency=0) was accepted")
@@ -0,0 +1,73 @@
+import threading
+
+import multiarch
+import pytest
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = multiarch.Scheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown(cancel_pending=True)
+
+
+def test_queued_work_runs_most_urgent_first(scheduler):
+    gate = threading.Event()
+    order = []
+    blocker = scheduler.submit(multiarch.PRIORITY_DELETE, gate.wait, 5)
+    futures = [
+        scheduler.submit(priority, order.append, name)
+        for priority, name in ((multiarch.PRIORITY_IMAGE, "image"), (multiarch.PRIORITY_DIGEST, "digest"),
+                               (multiarch.PRIORITY_TAG, "tag"), (multiarch.PRIORITY_DIGEST, "digest 2"))
+    ]
+
+    gate.set()
+    # Waiting with result() rather than gather(), which would run work on this thread too
+    for future in (blocker, *futures):
+        future.result(timeout=5)
+
+    # By priority, then in submission order
+    assert order == ["digest", "digest 2", "tag", "image"]
+
+
+def test_nested_waits_run_children_instead_of_deadlocking(scheduler):
+    def digest(n):
+        return n * 10
+
+    def tag(n):
+        children = [scheduler.submit(multiarch.PRIORITY_DIGEST, digest, n + i) for i in range(3)]
+        return sum(f.result() for f in scheduler.as_completed(children))
+
+    def image():
+        tags = [scheduler.submit(multiarch.PRIORITY_TAG, tag, n) for n in (0, 100)]
+        return scheduler.gather(tags)
+
+    # One worker: the image task holds it, so its tags (and theirs) run inline
+    assert scheduler.submit(multiarch.PRIORITY_IMAGE, image).result(timeout=5) == [30, 3030]
+
+
+def test_errors_reach_whoever_waits(scheduler):
+    future = scheduler.submit(multiarch.PRIORITY_TAG, int, "not a number")
+
+    with pytest.raises(ValueError):
+        scheduler.gather([future])
+
+
+def test_shutdown_can_drop_queued_work(scheduler):
+    started, gate = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        return gate.wait(5)
+
+    running = scheduler.submit(multiarch.PRIORITY_TAG, block)
+    started.wait(5)
+    queued = scheduler.submit(multiarch.PRIORITY_TAG, lambda: "ran")
+
+    scheduler.shutdown(cancel_pending=True)
+    gate.set()
+
+    assert running.result(timeout=5) is True
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(multiarch.PRIORITY_TAG, lambda: None)
@@ -0,0 +1,47 @@
+import multiarch
+from multiarch import Row, RowGroup
+
+
+def tag(name, children, digest="sha256:list"):
+    """A tag's group; children are (digest, platform, downloads[, status])."""
+    rows = [Row(name, "image", c[1], c[3] if len(c) > 3 else "Completed", c[2], c[0], is_child=True) for c in children]
+    return RowGroup([Row(name, "manifest/list", "multi", "Completed", sum(r.downloads for r in rows), digest)] + rows)
+
+
+def test_platform_totals_count_each_digest_once():
+    summary = multiarch.Summary()
+    shared = [("sha256:amd", "linux/amd64", 10), ("sha256:arm", "linux/arm64", 0)]
+
+    # latest and v1 are aliases of one manifest list
+    summary.add_image("app", [tag("latest", shared), tag("v1", shared), tag("v0", [("sha256:old", "linux/amd64", 5)])])
+    report = summary.report()
+
+    assert (report["images"], report["tags"]) == (1, 3)
+    assert report["downloads_by_platform"] == [
+        {"platform": "linux/amd64", "digests": 2, "downloads": 15},
+        {"platform": "linux/arm64", "digests": 1, "downloads": 0},
+    ]
+    assert report["platforms_never_pulled"] == ["linux/arm64"]
+    assert report["top_images"] == [{"image": "app", "downloads": 15}]
+
+
+def test_single_platform_tags_count_their_own_row():
+    summary = multiarch.Summary()
+    solo = RowGroup([Row("solo", "image", "unknown", "Completed", 37, "sha256:solo", slug="slug-solo")])
+
+    summary.add_image("app", [tag("latest", [("sha256:amd", "linux/amd64", 10)]), solo])
+    report = summary.report()
+
+    assert {"platform": "unknown", "digests": 1, "downloads": 37} in report["downloads_by_platform"]
+    assert report["top_images"] == [{"image": "app", "downloads": 47}]
+
+
+def test_quarantined_tags_and_top_n():
+    summary = multiarch.Summary(top_n=2)
+    for name, downloads in (("a", 1), ("b", 30), ("c", 20)):
+        summary.add_image(name, [tag("latest", [(f"sha256:{name}", "linux/amd64", downloads)])])
+    summary.add_image("d", [tag("bad", [("sha256:d", "linux/amd64", 0, "Quarantined")], digest="sha256:dlist")])
+    report = summary.report()
+
+    assert report["top_images"] == [{"image": "b", "downloads": 30}, {"image": "c", "downloads": 20}]
+    assert report["quarantined_tags"] == [{"image": "d", "tag": "bad", "digest": "sha256:dlist"}]
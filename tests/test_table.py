@@ -0,0 +1,45 @@
+import multiarch
+import pytest
+
+
+def group(tag, children):
+    rows = [multiarch.Row(tag, "manifest/list", "multi", "Completed", 0, "sha256:list")]
+    rows += [multiarch.Row(tag, "image", f"linux/{i}", "Completed", 0, f"sha256:{i}", is_child=True) for i in range(children)]
+    return multiarch.RowGroup(rows)
+
+
+GROUPS = [group("a", 2), group("b", 2), group("c", 1)]
+
+
+@pytest.mark.parametrize("max_rows, shown, hidden_rows, hidden_groups", [
+    (None, 8, 0, 0),
+    (8, 8, 0, 0),
+    (3, 3, 5, 2),
+    (4, 4, 4, 1),
+    (5, 5, 3, 1),
+    (0, 0, 8, 3),
+])
+def test_max_rows_counts_what_was_left_out(max_rows, shown, hidden_rows, hidden_groups):
+    cells, rows, groups = multiarch.table_cells(GROUPS, max_rows)
+
+    assert (len(cells), rows, groups) == (shown, hidden_rows, hidden_groups)
+    assert [is_parent for _, is_parent, _ in cells] == [True, False, False, True, False, False, True, False][:shown]
+
+
+def test_digest_column_is_narrowed_first():
+    widths = [10, 13, 11, 13, 9, 71]
+    full = sum(widths) + 3 * len(widths) + 1
+
+    assert multiarch.fit_column_widths(widths, full) == widths
+    assert multiarch.fit_column_widths(widths, full - 30) == [10, 13, 11, 13, 9, 41]
+
+    narrow = multiarch.fit_column_widths(widths, 80)
+    assert narrow[multiarch.TABLE_DIGEST_COLUMN] == multiarch.TABLE_MIN_DIGEST_WIDTH
+    assert sum(narrow) + 3 * len(narrow) + 1 == 80
+    assert all(width >= len(header) for width, header in zip(narrow, multiarch.TABLE_HEADERS))
+
+
+def test_columns_stop_at_their_headers():
+    widths = [len(header) for header in multiarch.TABLE_HEADERS[:6]]
+
+    assert multiarch.fit_column_widths(widths, 20) == widths
@@ -0,0 +1,35 @@
+import multiarch
+import pytest
+
+
+def test_parse_targets():
+    lines = ["# production", "ws/repo", "  ws/other/app  # one image", "", "ws/repo/nested/image/", "ws/repo"]
+
+    assert multiarch.parse_targets(lines) == [
+        ("ws", "repo", None), ("ws", "other", "app"), ("ws", "repo", "nested/image"), ("ws", "repo", None),
+    ]
+
+
+@pytest.mark.parametrize("line", ["ws", "ws/", "/repo", "ws//img"])
+def test_parse_targets_rejects_incomplete_lines(line):
+    with pytest.raises(ValueError, match="line 2"):
+        multiarch.parse_targets(["ws/repo", line])
+
+
+def test_a_failing_catalog_does_not_stop_the_other_targets(fake_registry, monkeypatch, capsys):
+    fake_registry(images=2, tags=1, platforms=1, untagged=0)
+    page_catalog = multiarch.page_catalog
+
+    def flaky_page_catalog(org, repo, on_page):
+        return False if repo == "broken" else page_catalog(org, repo, on_page)
+
+    monkeypatch.setattr(multiarch, "page_catalog", flaky_page_catalog)
+    targets = [("ws", "repo", None), ("ws", "broken", None), ("ws", "repo", "img0"), ("ws", "other", "img1")]
+    args = multiarch.argparse.Namespace(targets="targets.txt", output="json", include=None, exclude=None)
+    failures = []
+
+    jobs = [job for batch in multiarch.iter_scan_jobs(targets, args, failures) for job in batch]
+
+    assert sorted(label for *_, label in jobs) == ["ws/other/img1", "ws/repo/img0", "ws/repo/img1"]
+    assert failures == [("ws", "broken")]
+    assert "Failed to fetch catalog for ws/broken" in capsys.readouterr().err
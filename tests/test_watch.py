@@ -0,0 +1,36 @@
+import multiarch
+
+
+def rows(tag, digest, downloads, status="Completed"):
+    return multiarch.RowGroup([multiarch.Row(tag, "manifest/list", "multi", status, downloads, digest)])
+
+
+def test_prometheus_text():
+    store = multiarch.MetricsStore()
+    store.update("ws/repo/app", [rows("v1", "sha256:aa", 12), rows('say "hi"\\', "sha256:bb", None, "In Progress")])
+    store.finish_cycle({"ws/repo/app"}, 1.5)
+
+    text = store.to_prometheus()
+
+    assert text.endswith("\n")
+    assert ('cloudsmith_docker_downloads{image="ws/repo/app",tag="v1",type="manifest/list",platform="multi",'
+            'digest="sha256:aa"} 12') in text.splitlines()
+    assert ('cloudsmith_docker_status{image="ws/repo/app",tag="say \\"hi\\"\\\\",type="manifest/list",'
+            'platform="multi",digest="sha256:bb",status="In Progress"} 1') in text.splitlines()
+    assert "cloudsmith_docker_sleuth_cycles_total 1" in text
+    assert "cloudsmith_docker_sleuth_images 1" in text
+    assert "cloudsmith_docker_sleuth_last_cycle_duration_seconds 1.500" in text
+
+
+def test_images_a_cycle_did_not_return_are_pruned():
+    store = multiarch.MetricsStore()
+    store.update("a", [rows("v1", "sha256:aa", 1)])
+    store.update("b", [rows("v1", "sha256:bb", 2)])
+
+    store.finish_cycle({"a", "b"}, 1.0)
+    store.finish_cycle({"a"}, 1.0, prune=False)
+    assert set(store.to_json()["images"]) == {"a", "b"}
+
+    store.finish_cycle({"a"}, 1.0)
+    assert set(store.to_json()["images"]) == {"a"}
+    assert store.to_json()["cycles"] == 3
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+import multiarch
+import pytest
+
+RESULTS = {
+    "app": [multiarch.RowGroup([
+        multiarch.Row("latest", "manifest/list", "multi", "Completed", 7, "sha256:aaa", slug="slug-a", action="Deleted"),
+        multiarch.Row("latest", "image", "linux/amd64", "Completed", 7, "sha256:bbb", is_child=True),
+    ])],
+    "db, \"quoted\"": [multiarch.RowGroup([
+        multiarch.Row("v1", "manifest/list", "multi", "In Progress", 0, "sha256:ccc"),
+    ])],
+}
+
+
+def write(writer_class, results):
+    stream = io.StringIO()
+    writer = writer_class(stream)
+    for img_name, groups in results.items():
+        writer.write_image(img_name, groups)
+    writer.close()
+    return stream.getvalue(), writer.count
+
+
+def test_json_matches_a_single_dump():
+    output, count = write(multiarch.JSONWriter, RESULTS)
+
+    expected = json.dumps(RESULTS, indent=2, default=multiarch.Row.to_dict) + "\n"
+    assert output == expected
+    assert count == 2
+
+
+def test_json_without_results_is_an_empty_list():
+    assert write(multiarch.JSONWriter, {}) == ("[]\n", 0)
+
+
+def test_ndjson_has_one_object_per_row():
+    output, count = write(multiarch.NDJSONWriter, RESULTS)
+
+    records = [json.loads(line) for line in output.splitlines()]
+    assert [(r["image"], r["tag"], r["is_child"]) for r in records] == [
+        ("app", "latest", False), ("app", "latest", True), ('db, "quoted"', "v1", False),
+    ]
+    assert records[0]["slug"] == "slug-a"
+    assert "slug" not in records[1]
+    assert count == 2
+
+
+@pytest.mark.parametrize("results, rows", [(RESULTS, 3), ({}, 0)])
+def test_csv_has_a_header_and_one_line_per_row(results, rows):
+    output, _ = write(multiarch.CSVWriter, results)
+
+    lines = list(csv.reader(io.StringIO(output)))
+    assert lines[0] == list(multiarch.CSVWriter.HEADER)
+    assert len(lines) == 1 + rows
+    if rows:
+        assert lines[1] == ["app", "latest", "manifest/list", "multi", "Completed", "7", "sha256:aaa", "Deleted"]
+        assert lines[3][0] == 'db, "quoted"'
+        assert lines[2][-1] == ""